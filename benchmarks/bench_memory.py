@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compares peak memory of the default ingestion path (makeRequest -> r.json()
+-> parse) with the streaming path (--stream: fetchStream -> iterRecords ->
+parseStream) against a local HTTP server serving synthetic histories.
+
+Usage:
+    python benchmarks/bench_memory.py [sizes]
+
+    sizes       Comma separated record counts (Default: 10000,100000)
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import FakeApiServer
+from covid_tracker import CovidTracker
+
+def measure(base_url, stream):
+    args = ['-B', base_url, '--no-cache'] + (['--stream'] if stream else [])
+    tracker = CovidTracker(cli_args=args)
+    tracker.getSession()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tracker.loadData()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, tracker.datasets[tracker.getDatasetKey()]
+
+def main(args):
+    sizes = [10000, 100000]
+    if args:
+        sizes = [int(s) for s in args[0].split(',')]
+
+    print(f"{'records':>10}{'payload MB':>12}{'json peak MB':>14}{'stream peak MB':>16}{'json s':>9}{'stream s':>10}")
+    for n in sizes:
+        server = FakeApiServer(n)
+        payload = server.getBody('ut', 'daily')
+        json_peak, json_t, json_cols = measure(server.base_url, stream=False)
+        stream_peak, stream_t, stream_cols = measure(server.base_url, stream=True)
+        for kwd in json_cols:
+            if (json_cols[kwd] != stream_cols[kwd]).any():
+                sys.exit(f"ERROR: paths disagree on `{kwd}` for {n} records")
+        mb = 1024 * 1024
+        print(f"{n:>10}{len(payload) / mb:>12.1f}{json_peak / mb:>14.1f}"
+              f"{stream_peak / mb:>16.1f}{json_t:>9.2f}{stream_t:>10.2f}")
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
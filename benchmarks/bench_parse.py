@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compares the original parser (parseOLD below: np.insert per value, so
+quadratic) with CovidTracker.parse (columnar) on synthetic daily histories.
+
+Usage:
+    python benchmarks/bench_parse.py [sizes] [--old-max N]
+
+    sizes       Comma separated record counts (Default: 10000,100000,1000000)
+    --old-max   Largest size the quadratic parser is run on (Default: 20000)
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import makeRecords
+from covid_tracker import CovidTracker
+
+OLD_FIELDS = [
+    ("dates", "date"), ("active_cases", "positive"), ("negative", "negative"),
+    ("hospitalized", "hospitalizedCurrently"), ("total_hospitalized", "hospitalizedCumulative"),
+    ("in_icu", "inIcuCurrently"), ("total_in_icu", "inIcuCumulative"),
+    ("on_ventilator", "onVentilatorCurrently"), ("total_on_ventilator", "onVentilatorCumulative"),
+    ("total_recovered", "recovered"), ("total_deaths", "death"), ("total_tested", "total"),
+    ("pos_neg", "posNeg"), ("new_deaths", "deathIncrease"),
+    ("new_hospitalized", "hospitalizedIncrease"), ("new_cases", "positiveIncrease")
+]
+
+def parseOLD(tracker, data):
+    # The original parser: one np.insert (a full copy) per value
+    if type(data) is dict:
+        data = [data]
+    tracker.data["dates"]["data"] = np.array([], dtype='int64')
+    for d in data:
+        for kwd, value_kwd in OLD_FIELDS:
+            value = tracker.getVal(d, value_kwd)
+            tracker.data[kwd]['data'] = np.insert(tracker.data[kwd]['data'], 0, value)
+    tracker.data["dates"]["data"] = tracker.datesFromInts(tracker.data["dates"]["data"])
+
+def timeParser(name, records):
+    tracker = CovidTracker(cli_args=[])
+    parser = (lambda data: parseOLD(tracker, data)) if name == "parseOLD" else getattr(tracker, name)
+    start = time.perf_counter()
+    parser(records)
+    return time.perf_counter() - start, tracker.data
+
+def main(args):
+    sizes = [10000, 100000, 1000000]
+    old_max = 20000
+    for i, arg in enumerate(args):
+        if arg == '--old-max':
+            old_max = int(args[i+1])
+        elif arg[0].isdigit() and (i == 0 or args[i-1] != '--old-max'):
+            sizes = [int(s) for s in arg.split(',')]
+
+    print(f"{'records':>10}{'parseOLD (s)':>16}{'parse (s)':>14}{'speedup':>10}")
+    for n in sizes:
+        records = makeRecords(n)
+        new_t, new_data = timeParser("parse", records)
+        if n <= old_max:
+            old_t, old_data = timeParser("parseOLD", records)
+            for kwd in new_data:
+                if "api_field" not in new_data[kwd]:
+                    continue
+                if (new_data[kwd]["data"] != old_data[kwd]["data"]).any():
+                    sys.exit(f"ERROR: parsers disagree on `{kwd}` for {n} records")
+            print(f"{n:>10}{old_t:>16.4f}{new_t:>14.4f}{old_t / new_t:>9.1f}x")
+        else:
+            print(f"{n:>10}{'skipped':>16}{new_t:>14.4f}{'-':>10}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compares the batched projection fit (CovidTracker.fitLogLinear: one solve for
+every state and metric) with a per-state, per-metric np.polyfit loop on
+synthetic noisy exponential series with some missing and zero days.
+
+Usage:
+    python benchmarks/bench_project.py [states] [--window N] [--metrics M]
+
+    states      Comma separated state counts (Default: 51,510,5100)
+    --window    Days in each fit (Default: 21)
+    --metrics   Series fitted per state (Default: 6)
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common # Puts the repository root on sys.path
+from covid_tracker import CovidTracker
+
+def makeWindows(n_states, n_metrics, window, seed=0):
+    # state x metric x day, like np.moveaxis(block, 1, -1) in projectStates
+    rng = np.random.default_rng(seed)
+    rates = rng.uniform(-0.1, 0.1, (n_states, n_metrics, 1))
+    days = np.arange(window)
+    values = 1000 * np.exp(rates * days) * rng.lognormal(0, 0.1, (n_states, n_metrics, window))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[rng.random(values.shape) < 0.02] = 0
+    return np.round(values)
+
+def loopFit(values):
+    a = np.full(values.shape[:-1], np.nan)
+    b = np.full(values.shape[:-1], np.nan)
+    x = np.arange(values.shape[-1])
+    for idx in np.ndindex(*values.shape[:-1]):
+        y = values[idx]
+        usable = y > 0
+        if usable.sum() >= 2:
+            b[idx], a[idx] = np.polyfit(x[usable], np.log(y[usable]), 1)
+    return a, b
+
+def best(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main(args):
+    sizes = [51, 510, 5100]
+    window = 21
+    n_metrics = 6
+    for i, arg in enumerate(args):
+        if arg == '--window':
+            window = int(args[i+1])
+        elif arg == '--metrics':
+            n_metrics = int(args[i+1])
+        elif arg[0].isdigit() and (i == 0 or args[i-1] not in ['--window', '--metrics']):
+            sizes = [int(s) for s in arg.split(',')]
+
+    tracker = CovidTracker(cli_args=[])
+    print(f"{'states':>8}{'fits':>10}{'loop (s)':>12}{'batched (s)':>14}{'speedup':>10}")
+    for n in sizes:
+        values = makeWindows(n, n_metrics, window)
+        loop_t, (loop_a, loop_b) = best(loopFit, values, repeat=1)
+        batch_t, (batch_a, batch_b) = best(tracker.fitLogLinear, values)
+        if not (np.allclose(loop_a, batch_a, equal_nan=True) and np.allclose(loop_b, batch_b, equal_nan=True)):
+            sys.exit(f"ERROR: batched and per-state fits disagree for {n} states")
+        print(f"{n:>8}{n * n_metrics:>10}{loop_t:>12.4f}{batch_t:>14.4f}{loop_t / batch_t:>9.0f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
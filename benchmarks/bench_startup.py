@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tracks CLI startup cost per mode using `python -X importtime` and fails if a
+mode regresses against benchmarks/startup_baseline.json or imports a module it
+should not need (matplotlib/requests outside of plotting and fetching).
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--tolerance PCT] [--update-baseline]
+
+    --runs              Runs per mode, the median is reported (Default: 5)
+    --tolerance         Allowed slowdown over the baseline in percent (Default: 50)
+    --update-baseline   Writes the measured times as the new baseline
+"""
+
+import os
+import re
+import sys
+import json
+import tempfile
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import ROOT, makeRecords
+from covid_tracker import CovidTracker
+
+BASELINE = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+SCRIPT = os.path.join(ROOT, "covid_tracker.py")
+HEAVY = ["matplotlib", "requests"]
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def makeSnapshot(directory):
+    path = os.path.join(directory, "startup.bin")
+    tracker = CovidTracker(cli_args=[])
+    tracker.parse(makeRecords(365))
+    tracker.saveSnapshot(path)
+    return path
+
+def getModes(snapshot):
+    # name: (arguments after `python -X importtime`, modules it must not import)
+    return {
+        "import": (["-c", "import covid_tracker"], HEAVY),
+        "help": ([SCRIPT, "-h"], HEAVY),
+        "export": ([SCRIPT, "-E"], HEAVY),
+        "print": ([SCRIPT, "--load", snapshot, "--print=nc", "-l", "30"], HEAVY),
+    }
+
+def measure(args):
+    """
+    Returns (total import time in ms, set of top-level packages imported)
+    """
+    p = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total = 0
+    modules = set()
+    for line in p.stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m is None:
+            continue
+        total += int(m.group(1))
+        modules.add(m.group(4).split('.')[0])
+    return total / 1000, modules
+
+def main(args):
+    runs = 5
+    tolerance = 50.0
+    update = '--update-baseline' in args
+    for i, arg in enumerate(args):
+        if arg == '--runs':
+            runs = int(args[i+1])
+        elif arg == '--tolerance':
+            tolerance = float(args[i+1])
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = getModes(makeSnapshot(tmp))
+        print(f"{'mode':<10}{'import (ms)':>14}{'baseline':>12}")
+        for mode, (cmd, forbidden) in modes.items():
+            samples = []
+            for _ in range(runs):
+                ms, modules = measure(cmd)
+                samples.append(ms)
+            results[mode] = round(statistics.median(samples), 2)
+            base = baseline.get(mode)
+            print(f"{mode:<10}{results[mode]:>14.2f}{base if base is not None else '-':>12}")
+            for mod in forbidden:
+                if mod in modules:
+                    failures.append(f"`{mode}` imports {mod}")
+            if base is not None and results[mode] > base * (1 + tolerance / 100):
+                failures.append(f"`{mode}` took {results[mode]:.2f}ms (baseline {base:.2f}ms)")
+
+    if update:
+        with open(BASELINE, 'w') as f:
+            json.dump(results, f, indent=4)
+            f.write("\n")
+        print(f"Wrote {BASELINE}")
+    if failures:
+        sys.exit("REGRESSION:\n    " + "\n    ".join(failures))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
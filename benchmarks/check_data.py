@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Checks the dataset logic that needs no API: `--validate repair` and the
+upsert used by incremental updates. Each check prints `ok` or what went
+wrong, and the script exits non-zero if any check failed.
+
+Usage:
+    python benchmarks/check_data.py [--only NAME]
+
+    --only      Only runs checks whose name contains NAME
+"""
+
+import io
+import os
+import sys
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common # Puts the repository root on sys.path
+from covid_tracker import CovidTracker
+
+def newDataset(tracker, dates, **series):
+    # Zero-filled columns for `dates` (YYYY-MM-DD strings) with `series` set
+    dates = np.array(dates, dtype='datetime64[D]')
+    columns = {kwd: np.zeros(len(dates), dtype=tracker.dtypes[kwd]) for kwd in tracker.null_fields}
+    columns.update({kwd: np.array(values, dtype=tracker.dtypes[kwd]) for kwd, values in series.items()})
+    columns["dates"] = dates
+    columns["nulls"] = np.zeros(len(dates), dtype='uint32')
+    return columns
+
+def nullBits(tracker, days, rows):
+    # {date index: [null series]} -> a nulls bitmask column of `days` rows
+    nulls = np.zeros(days, dtype='uint32')
+    for i, kwds in rows.items():
+        for kwd in kwds:
+            nulls[i] |= np.uint32(1) << np.uint32(tracker.null_fields.index(kwd))
+    return nulls
+
+def checkRepair():
+    tracker = CovidTracker(cli_args=['-nc', '-V', 'repair'])
+    dates = ['2020-06-01', '2020-06-02', '2020-06-03', '2020-06-04', '2020-06-05']
+    columns = newDataset(tracker, dates, total_deaths=[10, 12, 11, 0, 20], new_deaths=[0, 2, 5, 3, 9])
+    columns["nulls"] = nullBits(tracker, 5, {3: ["total_deaths"]})
+    tracker.datasets['ut'] = columns
+    tracker.validateStates(['ut'])
+    repaired = tracker.datasets['ut']
+    assert repaired["total_deaths"].tolist() == [10, 12, 12, 12, 20], f"total_deaths {repaired['total_deaths'].tolist()}"
+    assert repaired["new_deaths"].tolist() == [0, 2, 0, 0, 8], f"new_deaths {repaired['new_deaths'].tolist()}"
+    assert not repaired["nulls"].any(), "repaired null is still flagged"
+    again = tracker.validateStates(['ut'])
+    left = [check for check, mask in again.items() if mask.any()]
+    assert not left, f"still flagged after repair: {left}"
+
+def checkRepairLeadingNull():
+    # A total with no earlier value stays null, and so does its increase
+    tracker = CovidTracker(cli_args=['-nc', '-V', 'repair'])
+    columns = newDataset(tracker, ['2020-06-01', '2020-06-02', '2020-06-03'],
+                         total_deaths=[0, 5, 7], new_deaths=[0, 0, 2])
+    columns["nulls"] = nullBits(tracker, 3, {0: ["total_deaths", "new_deaths"]})
+    tracker.datasets['ut'] = columns
+    tracker.validateStates(['ut'])
+    repaired = tracker.datasets['ut']
+    assert repaired["new_deaths"].tolist() == [0, 0, 2], f"new_deaths {repaired['new_deaths'].tolist()}"
+    null_bit = np.uint32(1) << np.uint32(tracker.null_fields.index("total_deaths"))
+    assert repaired["nulls"][0] & null_bit, "leading null total was dropped from nulls"
+
+def checkUpsert():
+    tracker = CovidTracker(cli_args=['-nc'])
+    tracker.datasets['ut'] = newDataset(tracker, ['2020-06-02', '2020-06-03', '2020-06-04'],
+                                        new_cases=[1, 2, 3])
+    rows = newDataset(tracker, ['2020-06-01', '2020-06-03', '2020-06-04', '2020-06-05'],
+                      new_cases=[7, 20, 3, 5])
+    summary = tracker.upsertRows('ut', rows)
+    merged = tracker.datasets['ut']
+    assert [str(d) for d in merged["dates"]] == ['2020-06-01', '2020-06-02', '2020-06-03', '2020-06-04',
+                                                 '2020-06-05'], f"dates {merged['dates']}"
+    assert merged["new_cases"].tolist() == [7, 1, 20, 3, 5], f"new_cases {merged['new_cases'].tolist()}"
+    assert merged["new_cases"].dtype == tracker.dtypes["new_cases"], f"new_cases became {merged['new_cases'].dtype}"
+    assert summary == "2 new date(s) (20200601, 20200605), 1 date(s) revised (1 value(s) changed)", summary
+
+def checkUpsertNullFilled():
+    # A null that is filled in counts once, as the value that changed
+    tracker = CovidTracker(cli_args=['-nc'])
+    old = newDataset(tracker, ['2020-06-01', '2020-06-02'], new_cases=[1, 0])
+    old["nulls"] = nullBits(tracker, 2, {1: ["new_cases"]})
+    tracker.datasets['ut'] = old
+    summary = tracker.upsertRows('ut', newDataset(tracker, ['2020-06-02'], new_cases=[4]))
+    merged = tracker.datasets['ut']
+    assert merged["new_cases"].tolist() == [1, 4] and not merged["nulls"].any(), \
+        f"new_cases {merged['new_cases'].tolist()}, nulls {merged['nulls'].tolist()}"
+    assert summary == "0 new date(s), 1 date(s) revised (1 value(s) changed)", summary
+    summary = tracker.upsertRows('ut', newDataset(tracker, ['2020-06-02'], new_cases=[4]))
+    assert summary == "0 new date(s), 0 date(s) revised (0 value(s) changed)", f"same rows again: {summary}"
+
+CHECKS = [
+    ("repair", checkRepair),
+    ("repair_leading_null", checkRepairLeadingNull),
+    ("upsert", checkUpsert),
+    ("upsert_null_filled", checkUpsertNullFilled),
+]
+
+def main(args):
+    only = args[args.index('--only') + 1] if '--only' in args else None
+    failed = []
+    for name, check in CHECKS:
+        if only is not None and only not in name:
+            continue
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                check()
+        except AssertionError as e:
+            failed.append(name)
+            print(f"{name:<24}FAILED: {e}")
+            continue
+        print(f"{name:<24}ok")
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Checks the fetch and response cache paths against the local stand-in API
+(common.FakeApiServer). Each check prints `ok` or what went wrong, and the
+script exits non-zero if any check failed.
+
+Usage:
+    python benchmarks/check_fetch.py [--only NAME]
+
+    --only      Only runs checks whose name contains NAME
+"""
+
+import io
+import os
+import sys
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import FakeApiServer
+from covid_tracker import CovidTracker, FetchError
+
+def newTracker(server, cache_dir, *args):
+    return CovidTracker(cli_args=['-B', server.base_url, '-cd', cache_dir] + list(args))
+
+def cacheFiles(cache_dir):
+    names = sorted(os.listdir(cache_dir))
+    return [n for n in names if n.endswith(".body")], [n for n in names if n.endswith(".meta")], \
+        [n for n in names if n.endswith(".tmp")]
+
+def checkStreamCommits(server, cache_dir):
+    # A streamed fetch stops reading at `]` but must still leave a complete entry
+    tracker = newTracker(server, cache_dir, '--stream')
+    columns = tracker.fetchColumns(tracker.generateStateUrl('ut'))
+    bodies, metas, tmps = cacheFiles(cache_dir)
+    assert len(columns["dates"]) == server.days, f"parsed {len(columns['dates'])} of {server.days} dates"
+    assert (len(bodies), len(metas), tmps) == (1, 1, []), f"cache holds {bodies + metas + tmps}"
+    again = newTracker(server, cache_dir, '--stream')
+    again.fetchColumns(again.generateStateUrl('ut'))
+    cache = again.getCache()
+    assert (cache.hits, cache.misses) == (1, 0), f"second run: {cache.hits} hit(s), {cache.misses} miss(es)"
+
+def fetchCached(server, cache_dir, state, *args):
+    # One cached fetch by a new tracker; returns its cache
+    tracker = newTracker(server, cache_dir, *args)
+    tracker.fetch(tracker.generateStateUrl(state))
+    return tracker.getCache()
+
+def checkTtl(server, cache_dir):
+    path = "/states/ut/daily.json"
+    before = server.hits.get(path, 0)
+    fetchCached(server, cache_dir, 'ut')
+    cache = fetchCached(server, cache_dir, 'ut')
+    assert cache.hits == 1 and server.hits[path] - before == 1, \
+        f"fresh entry: {cache.hits} hit(s), {server.hits[path] - before} request(s)"
+
+def checkRevalidation(server, cache_dir):
+    fetchCached(server, cache_dir, 'az', '-ct', '0')
+    not_modified = server.hits.get("304", 0)
+    cache = fetchCached(server, cache_dir, 'az', '-ct', '0')
+    assert cache.revalidated == 1 and server.hits["304"] == not_modified + 1, \
+        f"stale entry: {cache.revalidated} revalidated, {server.hits['304'] - not_modified} 304(s)"
+    server.revise('az', 'positive', 123456789)
+    tracker = newTracker(server, cache_dir, '-ct', '0')
+    body = tracker.fetch(tracker.generateStateUrl('az'))
+    assert tracker.getCache().misses == 1 and b'123456789' in body, "changed body was not refetched"
+
+def checkEviction(server, cache_dir):
+    # Each body is ~70KB, so a 0.15MB cache holds two
+    size = ['-cs', '0.15']
+    for state in ['co', 'id', 'co', 'mt']: # `co` is used again, so `id` is least recently used
+        fetchCached(server, cache_dir, state, *size)
+    cache = newTracker(server, cache_dir, *size).getCache()
+    kept = [state for state in ['co', 'id', 'mt'] if cache.lookupMeta(f"{server.base_url}/states/{state}/daily.json")]
+    assert kept == ['co', 'mt'], f"kept {kept}"
+
+def checkOffline(server, cache_dir):
+    fetchCached(server, cache_dir, 'nv', '-ct', '0')
+    path = "/states/nv/daily.json"
+    before = server.hits[path]
+    cache = fetchCached(server, cache_dir, 'nv', '-ct', '0', '--offline')
+    assert cache.hits == 1 and server.hits[path] == before, "stale entry was not served offline"
+    try:
+        fetchCached(server, cache_dir, 'nm', '--offline')
+    except SystemExit as e:
+        assert "not cached" in str(e), f"uncached offline fetch: {e}"
+    else:
+        raise AssertionError("uncached offline fetch did not fail")
+
+def fetchWithFaults(server, state, faults, *args):
+    # Fetches one state with `faults` queued first; returns (error or None, requests the server saw)
+    path = f"/states/{state}/daily.json"
+    server.addFaults(path, *faults)
+    before = server.hits.get(path, 0)
+    tracker = CovidTracker(cli_args=['-B', server.base_url, '-nc'] + list(args))
+    try:
+        tracker.fetch(tracker.generateStateUrl(state))
+        error = None
+    except FetchError as e:
+        error = e
+    finally:
+        tracker.closeFetcher()
+        server.faults.pop(path, None)
+    return error, server.hits[path] - before
+
+def checkRetries(server, cache_dir, *args):
+    error, hits = fetchWithFaults(server, 'ca', [503, 429], '-R', '3', *args)
+    assert error is None and hits == 3, f"503, 429 then 200: {error or 'ok'} after {hits} request(s)"
+    error, hits = fetchWithFaults(server, 'ny', [503, 503, 503], '-R', '1', *args)
+    assert error is not None and hits == 2, f"retries exhausted: {error or 'ok'} after {hits} request(s)"
+    error, hits = fetchWithFaults(server, 'tx', [404], '-R', '3', *args)
+    assert error is not None and hits == 1, f"404 is not retried: {error or 'ok'} after {hits} request(s)"
+    error, hits = fetchWithFaults(server, 'fl', [(503, 1.0)], '-R', '1', '-T', '0.3', *args)
+    assert error is None and hits == 2, f"timeout then 200: {error or 'ok'} after {hits} request(s)"
+
+def checkAsyncRetries(server, cache_dir):
+    checkRetries(server, cache_dir, '--async')
+
+CHECKS = [
+    ("ttl", checkTtl),
+    ("revalidation", checkRevalidation),
+    ("eviction", checkEviction),
+    ("offline", checkOffline),
+    ("stream_commits", checkStreamCommits),
+    ("retries", checkRetries),
+    ("async_retries", checkAsyncRetries),
+]
+
+def main(args):
+    only = args[args.index('--only') + 1] if '--only' in args else None
+    server = FakeApiServer(200)
+    failed = []
+    for name, check in CHECKS:
+        if only is not None and only not in name:
+            continue
+        with tempfile.TemporaryDirectory() as cache_dir:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    check(server, cache_dir)
+            except AssertionError as e:
+                failed.append(name)
+                print(f"{name:<24}FAILED: {e}")
+                continue
+        print(f"{name:<24}ok")
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,166 @@
+"""
+Shared helpers for the benchmarks: synthetic covidtracking-shaped records and
+a local stand-in for the API.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import random
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIELDS = [
+    "positive", "negative", "hospitalizedCurrently", "hospitalizedCumulative",
+    "inIcuCurrently", "inIcuCumulative", "onVentilatorCurrently",
+    "onVentilatorCumulative", "recovered", "death", "total", "posNeg",
+    "deathIncrease", "hospitalizedIncrease", "positiveIncrease"
+]
+
+def makeRecords(n, seed=0, state="ut"):
+    # Newest record first, like the API. Some fields are null/missing.
+    rng = random.Random(seed)
+    first = datetime.date(2020, 3, 1)
+    records = []
+    for i in range(n):
+        day = first + datetime.timedelta(days=n - 1 - i)
+        rec = {"date": int(day.strftime("%Y%m%d")), "state": state.upper()}
+        for field in FIELDS:
+            r = rng.random()
+            if r < 0.05:
+                rec[field] = None
+            elif r < 0.9:
+                rec[field] = rng.randint(0, 100000)
+        records.append(rec)
+    return records
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    # /states/<st>/<daily|current|YYYYMMDD>.json, /us/<...>.json and the
+    # all-states /states/<daily|current>.json
+    PATH = re.compile(r"^/(?:states/(\w\w)/|(us)/|states/)(\w+)\.json$")
+
+    def do_GET(self):
+        self.server.count(self.path)
+        fault = self.server.takeFault(self.path)
+        if fault is not None:
+            status, delay = fault
+            time.sleep(delay)
+            self.reply(status, b'{"error": "injected"}', {"Retry-After": "0"} if status == 429 else {})
+            return
+        m = self.PATH.match(self.path)
+        if m is None:
+            self.reply(404, b'{"error": "not found"}')
+            return
+        key = m.group(1) or m.group(2)
+        body = self.server.getBody(key, m.group(3))
+        if body is None:
+            self.reply(404, b'{"error": "not found"}')
+            return
+        # Validators like the real API's, so cached bodies can be revalidated
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("304")
+            self.reply(304, b'', {"ETag": etag})
+        else:
+            self.reply(200, body, {"ETag": etag, "Last-Modified": "Sat, 07 Mar 2021 00:00:00 GMT"})
+
+    def reply(self, status, body, headers={}):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # The client timed out
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeApiServer(ThreadingHTTPServer):
+    """
+    Serves `days` of synthetic history for every state on a free local port.
+    The all-states documents cover `states`. Payloads are encoded once and
+    kept in memory. Replies carry an ETag and answer a matching
+    If-None-Match with 304. Errors and slow replies can be queued per path
+    with addFaults, and `hits` counts the requests for each path (and 304s).
+    """
+    daemon_threads = True
+
+    def __init__(self, days, states=()):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.days = days
+        self.states = list(states)
+        self.records = {}
+        self.bodies = {}
+        self.lock = threading.Lock()
+        self.faults = {} # path -> [(status, delay), ...] replied before the real body
+        self.hits = {}
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def addFaults(self, path, *faults):
+        # Each fault is a status code, or (status, seconds to wait before replying)
+        with self.lock:
+            self.faults.setdefault(path, []).extend(f if type(f) is tuple else (f, 0) for f in faults)
+
+    def takeFault(self, path):
+        with self.lock:
+            queued = self.faults.get(path)
+            return queued.pop(0) if queued else None
+
+    def count(self, path):
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def getRecords(self, key):
+        with self.lock:
+            if key not in self.records:
+                self.records[key] = makeRecords(self.days, seed=hash(key) % 1000, state=key)
+            return self.records[key]
+
+    def revise(self, key, field, value):
+        # Changes the newest record of `key`, like a correction upstream
+        self.getRecords(key)[0][field] = value
+        with self.lock:
+            self.bodies.clear()
+
+    def getBody(self, key, which):
+        cache_key = (key, which)
+        if cache_key not in self.bodies:
+            if key is None:
+                return self.getBulkBody(which)
+            records = self.getRecords(key)
+            if which == 'daily':
+                payload = records
+            elif which == 'current':
+                payload = records[0] if key != 'us' else [records[0]]
+            else:
+                payload = [r for r in records if str(r["date"]) == which]
+                if not payload:
+                    return None
+                payload = payload[0]
+            self.bodies[cache_key] = json.dumps(payload).encode()
+        return self.bodies[cache_key]
+
+    def getBulkBody(self, which):
+        # Newest date first, then by state, like /states/daily.json
+        if which not in ('daily', 'current') or not self.states:
+            return None
+        per_state = [self.getRecords(st) for st in sorted(self.states)]
+        days = 1 if which == 'current' else self.days
+        payload = [records[i] for i in range(days) for records in per_state]
+        self.bodies[(None, which)] = json.dumps(payload).encode()
+        return self.bodies[(None, which)]
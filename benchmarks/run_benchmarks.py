@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the fetch, ingest, slice, derived-metric, aggregation and
+render hot paths. Payloads are synthetic covidtracking-shaped histories served
+by a local stand-in API (common.FakeApiServer), from one state over one year
+up to every state over several years.
+
+Each benchmark reports the best of `--repeat` runs. Results are compared with
+benchmarks/baseline.json and the script exits non-zero if any benchmark is
+more than `--tolerance` percent slower.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--repeat N] [--tolerance PCT]
+                                        [--only NAME] [--save-baseline]
+
+    --quick           Skips the largest scenario
+    --repeat          Runs per benchmark, the fastest is kept (Default: 3)
+    --tolerance       Allowed slowdown over the baseline in percent (Default: 50)
+    --only            Only runs benchmarks whose name contains NAME
+    --save-baseline   Writes the results as the new baseline
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import ROOT, FakeApiServer
+from covid_tracker import CovidTracker
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+ALL_STATES = CovidTracker(cli_args=[]).states
+
+# (number of states, days of history)
+SCENARIOS = [(1, 365), (1, 1095), (51, 365), (51, 1095)]
+
+def bestOf(repeat, setup, func):
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        func(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def quiet(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def newTracker(server, *args):
+    return CovidTracker(cli_args=['-B', server.base_url, '--no-cache'] + list(args))
+
+def loadedTracker(server, states, *args):
+    tracker = newTracker(server, *args)
+    for st in states:
+        tracker.datasets[st] = tracker.parseColumns(server.getRecords(st))
+    return tracker
+
+def runScenario(n_states, days, repeat, only, outdir):
+    states = ALL_STATES[:n_states]
+    server = FakeApiServer(days, states)
+    for st in states:
+        server.getBody(st, 'daily')
+    server.getBody(None, 'daily')
+    results = {}
+
+    def bench(name, setup, func):
+        if only and only not in name:
+            return
+        results[name] = bestOf(repeat, setup, func)
+
+    bench("fetch", lambda: newTracker(server),
+          lambda t: t.fetchStates(states))
+    bench("fetch_stream", lambda: newTracker(server, '--stream'),
+          lambda t: t.fetchStates(states))
+    bench("fetch_bulk", lambda: newTracker(server, '--bulk'),
+          lambda t: t.fetchStates(states))
+    bench("ingest", lambda: newTracker(server),
+          lambda t: [t.parseColumns(server.getRecords(st)) for st in states])
+    bench("ingest_stream", lambda: newTracker(server),
+          lambda t: [t.parseStreamColumns(iter(server.getRecords(st))) for st in states])
+
+    def sliceAll(t):
+        for st in states:
+            for _ in range(20):
+                t.useDataset(st)
+                t.applyModifier()
+    bench("derived+slice", lambda: loadedTracker(server, states, '--from', '20200601', '-l', '90'), sliceAll)
+
+    if n_states > 1:
+        bench("aggregate_rank", lambda: loadedTracker(server, states, '--rank', 'nck', '-rw', '7'),
+              lambda t: quiet(t.rankStates, states))
+        bench("aggregate_sum", lambda: loadedTracker(server, states, '--sum-states'),
+              lambda t: t.aggregateStates(states))
+
+    def render(t):
+        t.useDataset(states[0])
+        t.applyModifier()
+        quiet(t.plotData)
+    bench("render", lambda: loadedTracker(server, states[:1], '--plot=nc,nc7', '-o', outdir), render)
+
+    server.shutdown()
+    server.server_close()
+    return results
+
+def main(args):
+    repeat = 3
+    tolerance = 50.0
+    only = None
+    scenarios = SCENARIOS[:-1] if '--quick' in args else SCENARIOS
+    for i, arg in enumerate(args):
+        if arg == '--repeat':
+            repeat = int(args[i+1])
+        elif arg == '--tolerance':
+            tolerance = float(args[i+1])
+        elif arg == '--only':
+            only = args[i+1]
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    print(f"{'benchmark':<32}{'seconds':>12}{'baseline':>12}{'change':>10}")
+    with tempfile.TemporaryDirectory() as outdir:
+        for n_states, days in scenarios:
+            for name, seconds in runScenario(n_states, days, repeat, only, outdir).items():
+                key = f"{n_states}x{days}/{name}"
+                results[key] = seconds
+                base = baseline.get(key)
+                if base is None:
+                    print(f"{key:<32}{seconds:>12.4f}{'-':>12}{'-':>10}")
+                    continue
+                change = (seconds / base - 1) * 100
+                print(f"{key:<32}{seconds:>12.4f}{base:>12.4f}{change:>+9.0f}%")
+                if change > tolerance:
+                    failures.append(f"{key} took {seconds:.4f}s (baseline {base:.4f}s)")
+
+    if '--save-baseline' in args:
+        baseline.update({k: round(v, 6) for k, v in results.items()})
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Wrote {BASELINE}")
+    if failures:
+        sys.exit("REGRESSION:\n    " + "\n    ".join(failures))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
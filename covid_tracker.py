@@ -2,11 +2,469 @@
 
 import os
 import sys
+import json
+import time
 import random
-import requests
+import mmap
+import struct
+import hashlib
+import codecs
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+try:
+    import resource # Unix only, used by Profiler
+except ImportError:
+    resource = None
+
+# Heavy imports are deferred until a run actually plots or fetches,
+# so `-h`, `-E` and snapshot/print-only runs never pay for them.
+# See benchmarks/bench_startup.py.
+plt = None
+mpl = None
+requests = None
+HTTPAdapter = None
+Retry = None
+
+def importPlotting(backend=None):
+    global plt, mpl
+    if plt is None:
+        import matplotlib as mpl
+        if backend is not None:
+            mpl.use(backend)
+        import matplotlib.pyplot as plt
+
+def importRequests():
+    global requests, HTTPAdapter, Retry
+    if requests is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+SNAPSHOT_MAGIC = b"CVTS"
+SNAPSHOT_VERSION = 2 # 2: dates are datetime64[D] (1 stored YYYYMMDD integers)
+SNAPSHOT_ALIGN = 64
+NULL = np.iinfo(np.int64).min # Placeholder the parsers write for missing/null fields
+
+# Every series the tracker knows about. loadDefaults() builds self.data from
+# this table, processFlag() resolves `--plot=`/`--print=` keywords (`key` or
+# `short`) through an index built from it, parseColumns() reads `api_field`
+# and help() lists it. Adding a metric only means adding a row here (plus a
+# method for `derive`, which is (method name, *arguments)). `bin` is how
+# downsampled charts combine days: sum, mean or last (the default).
+# validateStates() checks that `cumulative` series never decrease and that
+# `increase_of` series match the day-over-day difference of that series.
+METRICS = [
+    {"key": "active_cases", "api_field": "positive", "short": "ac", "title": "Active Cases", "dtype": "int64", "color": "red", "color_type": "bad", "cumulative": True},
+    {"key": "negative", "api_field": "negative", "short": "ng", "title": "Negative Cases", "dtype": "int64", "color": "green", "color_type": "good", "cumulative": True},
+    {"key": "hospitalized", "api_field": "hospitalizedCurrently", "short": "ch", "title": "Currently Hospitalized", "dtype": "int64", "color": "red", "color_type": "bad"},
+    {"key": "total_hospitalized", "api_field": "hospitalizedCumulative", "short": "th", "title": "Total Hospitalized", "dtype": "int64", "color": "red", "color_type": "bad", "cumulative": True},
+    {"key": "in_icu", "api_field": "inIcuCurrently", "short": "ci", "title": "Currently in ICU", "dtype": "int64", "color": "red", "color_type": "bad"},
+    {"key": "total_in_icu", "api_field": "inIcuCumulative", "short": "ti", "title": "Total in ICU", "dtype": "int64", "color": "red", "color_type": "bad", "cumulative": True},
+    {"key": "on_ventilator", "api_field": "onVentilatorCurrently", "short": "cv", "title": "New on Ventilator", "dtype": "int64", "color": "red", "color_type": "bad"},
+    {"key": "total_on_ventilator", "api_field": "onVentilatorCumulative", "short": "tv", "title": "Total on Ventilator", "dtype": "int64", "color": "red", "color_type": "bad", "cumulative": True},
+    {"key": "total_recovered", "api_field": "recovered", "short": "tr", "title": "Total Recovered", "dtype": "int64", "color": "green", "color_type": "green", "cumulative": True},
+    {"key": "total_deaths", "api_field": "death", "short": "td", "title": "Total Deaths", "dtype": "int64", "color": "red", "color_type": "bad", "cumulative": True},
+    {"key": "total_tested", "api_field": "total", "short": "tt", "title": "Total Tested", "dtype": "int64", "color": "goldenrod", "color_type": "neutral", "cumulative": True},
+    {"key": "pos_neg", "api_field": "posNeg", "short": "pn", "title": "Pos/Neg", "dtype": "int64", "color": "goldenrod", "color_type": "neutral", "cumulative": True},
+    {"key": "new_deaths", "api_field": "deathIncrease", "short": "nd", "title": "New Deaths", "dtype": "int64", "color": "red", "color_type": "bad", "bin": "sum", "increase_of": "total_deaths"},
+    {"key": "new_hospitalized", "api_field": "hospitalizedIncrease", "short": "nh", "title": "New Hospitalized", "dtype": "int64", "color": "red", "color_type": "bad", "bin": "sum", "increase_of": "total_hospitalized"},
+    {"key": "new_cases", "api_field": "positiveIncrease", "short": "nc", "title": "New Cases", "dtype": "int64", "color": "red", "color_type": "bad", "bin": "sum", "increase_of": "active_cases"},
+    # Derived series, computed from the columns above by computeDerived()
+    {"key": "new_cases_7day", "derive": ("rollingMean", "new_cases", 7), "short": "nc7", "title": "New Cases (7-Day Avg)", "dtype": "float64", "color": "maroon", "color_type": "bad", "bin": "mean"},
+    {"key": "new_deaths_7day", "derive": ("rollingMean", "new_deaths", 7), "short": "nd7", "title": "New Deaths (7-Day Avg)", "dtype": "float64", "color": "crimson", "color_type": "bad", "bin": "mean"},
+    {"key": "case_growth", "derive": ("growthRate", "active_cases"), "short": "cg", "title": "Case Growth (%/day)", "dtype": "float64", "color": "orange", "color_type": "bad", "bin": "mean"},
+    {"key": "positivity", "derive": ("percentage", "active_cases", "total_tested"), "short": "pr", "title": "Test Positivity (%)", "dtype": "float64", "color": "orchid", "color_type": "neutral", "bin": "mean"},
+    {"key": "new_cases_per_100k", "derive": ("perCapita", "new_cases_7day"), "short": "nck", "title": "New Cases per 100k (7-Day Avg)", "dtype": "float64", "color": "salmon", "color_type": "bad", "bin": "mean"},
+    {"key": "deaths_per_100k", "derive": ("perCapita", "total_deaths"), "short": "tdk", "title": "Total Deaths per 100k", "dtype": "float64", "color": "purple", "color_type": "bad"}
+]
+
+class FetchError(Exception):
+    """
+    Raised when a URL could not be fetched (after retries)
+    """
+    pass
+
+class FetchResponse(object):
+    # The parts of requests.Response that fetch() uses
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+class AsyncFetcher(object):
+    """
+    asyncio (aiohttp) HTTP client with one persistent connection pool.
+    The event loop runs in a daemon thread so synchronous code, including
+    worker threads, can call get(). Requests to each host are limited to
+    `per_host` connections and `rate` requests per second (0 = unlimited),
+    time out after `timeout` seconds and are retried with jittered
+    exponential backoff on connection errors, timeouts, 429 and 5xx.
+    """
+    def __init__(self, per_host=8, rate=0, timeout=30, retries=3, backoff=0.5):
+        try:
+            import aiohttp
+        except ImportError:
+            sys.exit("ERROR: `--async` requires aiohttp (`pip install aiohttp`).")
+        import asyncio
+        self.aiohttp = aiohttp
+        self.asyncio = asyncio
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retried = 0
+        self.next_slot = {} # host -> loop time the next request may start
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.session = self.call(self.openSession())
+
+    async def openSession(self):
+        connector = self.aiohttp.TCPConnector(limit_per_host=self.per_host)
+        timeout = self.aiohttp.ClientTimeout(total=self.timeout)
+        return self.aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def call(self, coro):
+        return self.asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get(self, url, headers=None):
+        return self.call(self.request(url, headers or {}))
+
+    async def throttle(self, host):
+        # Only runs on the loop thread, so no lock is needed around next_slot
+        if not self.rate:
+            return
+        now = self.loop.time()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + 1 / self.rate
+        if slot > now:
+            await self.asyncio.sleep(slot - now)
+
+    async def request(self, url, headers):
+        from urllib.parse import urlsplit
+        host = urlsplit(url).netloc
+        response = None
+        for attempt in range(self.retries + 1):
+            await self.throttle(host)
+            retry_after = None
+            try:
+                async with self.session.get(url, headers=headers) as r:
+                    response = FetchResponse(r.status, r.headers.copy(), await r.read())
+                error = f"status code {response.status_code}"
+                if response.status_code != 429 and response.status_code < 500:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            except (self.aiohttp.ClientError, self.asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt == self.retries:
+                break
+            delay = self.backoff * 2 ** attempt
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            self.retried += 1
+            await self.asyncio.sleep(random.uniform(0.5, 1.5) * delay)
+        raise FetchError(f"Could not fetch `{url}` after {self.retries + 1} attempts: {error}")
+
+    def close(self):
+        self.call(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+class Profiler(object):
+    """
+    Per-stage wall time, the process's peak RSS after each stage and
+    counters for one run. Counters are kept for the whole run and for the
+    innermost stage running in the counting thread.
+    Always on (a perf_counter and a getrusage call per stage); allocation
+    tracking with tracemalloc is opt-in because it slows Python down.
+    """
+    def __init__(self, track_allocations=False):
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.local = threading.local() # Each thread's stack of running stage names
+        self.track_allocations = track_allocations
+        if track_allocations:
+            import tracemalloc
+            tracemalloc.start()
+
+    def getRunning(self):
+        if not hasattr(self.local, "running"):
+            self.local.running = []
+        return self.local.running
+
+    def count(self, name, amount=1):
+        running = self.getRunning()
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if running:
+                info = self.stages.setdefault(running[-1], {"calls": 0, "seconds": 0.0})
+                counters = info.setdefault("counters", {})
+                counters[name] = counters.get(name, 0) + amount
+
+    def stage(self, name, exclude=None):
+        return ProfilerStage(self, name, exclude)
+
+    def record(self, name, seconds, alloc_peak=None):
+        with self.lock:
+            info = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            info["calls"] += 1
+            info["seconds"] += seconds
+            # The process's peak so far when the stage ended, not the stage's own peak
+            info["process_peak_rss_kb"] = self.getPeakRss()
+            if alloc_peak is not None:
+                info["alloc_peak_bytes"] = max(info.get("alloc_peak_bytes", 0), alloc_peak)
+
+    def getPeakRss(self):
+        # In KB; ru_maxrss is KB on Linux but bytes on macOS. None without `resource` (Windows)
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+    def report(self):
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "total_seconds": time.perf_counter() - self.start,
+            "peak_rss_kb": self.getPeakRss(),
+            "stages": self.stages,
+            "counters": self.counters
+        }
+
+class ProfilerStage(object):
+    """
+    One timed stage, used as a context manager. A stage can instead time
+    only the items it produces with iterate(), e.g. the download side of a
+    streamed parse; the stage consuming them passes it as `exclude` so that
+    time is not counted twice.
+    """
+    def __init__(self, profiler, name, exclude=None):
+        self.profiler = profiler
+        self.name = name
+        self.exclude = exclude
+        self.items = None
+        self.seconds = 0.0
+
+    def __enter__(self):
+        if self.profiler.track_allocations:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self.profiler.getRunning().append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.exclude is not None and self.exclude.items is not None:
+            self.exclude.items.close() # Finishes (and records) the excluded stage first
+        seconds = time.perf_counter() - self.start
+        if self.exclude is not None:
+            seconds -= self.exclude.seconds
+        self.profiler.getRunning().pop()
+        alloc_peak = None
+        if self.profiler.track_allocations:
+            import tracemalloc
+            alloc_peak = tracemalloc.get_traced_memory()[1]
+        self.profiler.record(self.name, seconds, alloc_peak)
+        return False
+
+    def iterate(self, iterable):
+        # Yields from `iterable`, timing only next() (and close()) as this stage; recorded once at the end
+        self.items = self.iterItems(iter(iterable))
+        return self.items
+
+    def iterItems(self, iterator):
+        running = self.profiler.getRunning()
+        try:
+            while True:
+                running.append(self.name)
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.seconds += time.perf_counter() - start
+                    running.pop()
+                yield item
+        finally:
+            if hasattr(iterator, "close"):
+                running.append(self.name)
+                start = time.perf_counter()
+                try:
+                    iterator.close()
+                finally:
+                    self.seconds += time.perf_counter() - start
+                    running.pop()
+            self.profiler.record(self.name, self.seconds)
+
+class ResponseCache(object):
+    """
+    On-disk cache of API responses keyed by URL.
+    Entries are served while younger than `ttl` seconds, then revalidated with
+    the stored ETag/Last-Modified. Least recently used entries are evicted once
+    the cache grows past `max_bytes`.
+    """
+    def __init__(self, directory, ttl=3600, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def getPaths(self, url):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.body", f"{base}.meta"
+
+    def lookup(self, url):
+        """
+        Returns (body, meta) for `url`, or (None, None) if it is not cached
+        """
+        body_path, meta_path = self.getPaths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return body, meta
+
+    def lookupMeta(self, url):
+        body_path, meta_path = self.getPaths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return meta
+
+    def iterBody(self, url, chunk_size=65536):
+        body_path, _ = self.getPaths(url)
+        with open(body_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def storeChunks(self, url, chunks, headers):
+        """
+        Passes `chunks` through while writing them to the cache, committing
+        the entry only once the whole body has been read. A body abandoned
+        part way (closed or failed) leaves nothing behind.
+        """
+        body_path, meta_path = self.getPaths(url)
+        tmp = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+        except BaseException:
+            self.remove(tmp)
+            raise
+        os.replace(tmp, body_path)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "size": size
+        }
+        self.writeAtomic(meta_path, json.dumps(meta).encode())
+        self.evict()
+
+    def isFresh(self, meta):
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def getValidators(self, meta):
+        headers = {}
+        if meta is None:
+            return headers
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def markUsed(self, url):
+        # The body's mtime is the LRU clock
+        body_path, _ = self.getPaths(url)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    def writeAtomic(self, path, contents):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(contents)
+        os.replace(tmp, path)
+
+    def store(self, url, body, headers):
+        body_path, meta_path = self.getPaths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "size": len(body)
+        }
+        self.writeAtomic(body_path, body)
+        self.writeAtomic(meta_path, json.dumps(meta).encode())
+        self.evict()
+
+    def refresh(self, url, meta):
+        # Called on `304 Not Modified`: the cached body is good for another ttl
+        _, meta_path = self.getPaths(url)
+        meta["fetched_at"] = time.time()
+        self.writeAtomic(meta_path, json.dumps(meta).encode())
+        self.markUsed(url)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                # Left by a killed writer; live writes touch theirs continuously
+                try:
+                    if time.time() - os.stat(path).st_mtime > 3600:
+                        self.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".body"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            for p in (path, path[:-len(".body")] + ".meta"):
+                self.remove(p)
+            total -= size
 
 class CovidTracker(object):
     """
@@ -30,6 +488,30 @@ class CovidTracker(object):
             'wy'
         ]
 
+        # Census regions, used by `--region`
+        self.census_regions = {
+            'northeast': ['ct', 'me', 'ma', 'nh', 'ri', 'vt', 'nj', 'ny', 'pa'],
+            'midwest': ['il', 'in', 'mi', 'oh', 'wi', 'ia', 'ks', 'mn', 'mo', 'ne', 'nd', 'sd'],
+            'south': ['de', 'fl', 'ga', 'md', 'nc', 'sc', 'va', 'dc', 'wv', 'al',
+                      'ky', 'ms', 'tn', 'ar', 'la', 'ok', 'tx'],
+            'west': ['az', 'co', 'id', 'mt', 'nv', 'nm', 'ut', 'wy', 'ak', 'ca', 'hi', 'or', 'wa']
+        }
+
+        # 2019 Census population estimates, used for per-capita metrics
+        self.populations = {
+            'al': 4903185, 'ak': 731545, 'az': 7278717, 'ar': 3017804, 'ca': 39512223,
+            'co': 5758736, 'ct': 3565287, 'de': 973764, 'dc': 705749, 'fl': 21477737,
+            'ga': 10617423, 'hi': 1415872, 'id': 1787065, 'il': 12671821, 'in': 6732219,
+            'ia': 3155070, 'ks': 2913314, 'ky': 4467673, 'la': 4648794, 'me': 1344212,
+            'md': 6045680, 'ma': 6892503, 'mi': 9986857, 'mn': 5639632, 'ms': 2976149,
+            'mo': 6137428, 'mt': 1068778, 'ne': 1934408, 'nv': 3080156, 'nh': 1359711,
+            'nj': 8882190, 'nm': 2096829, 'ny': 19453561, 'nc': 10488084, 'nd': 762062,
+            'oh': 11689100, 'ok': 3956971, 'or': 4217737, 'pa': 12801989, 'ri': 1059361,
+            'sc': 5148714, 'sd': 884659, 'tn': 6829174, 'tx': 28995881, 'ut': 3205958,
+            'vt': 623989, 'va': 8535519, 'wa': 7614893, 'wv': 1792147, 'wi': 5822434,
+            'wy': 578759, 'us': 328239523
+        }
+
         self.colors = {
             "invalid_color": {
                     "is_used": True,
@@ -235,10 +717,12 @@ class CovidTracker(object):
 
 
         self.loadDefaults()
+        self.cli_args = cli_args
         if cli_args is not None or len(cli_args) > 1:
             self.processCliArgs(cli_args)
         else:
             print('Running with only Default Values')
+        self.profiler = Profiler(track_allocations=self.profile_allocations)
 
     def loadDefaults(self):
         """
@@ -246,6 +730,67 @@ class CovidTracker(object):
         """
         self.url = None
         self.date = "daily"
+
+        # Response cache (see ResponseCache)
+        self.use_cache = True
+        self.offline = False
+        self.cache = None
+        self.cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "covid_tracker")
+        self.cache_ttl = 3600 # Seconds before a cached response is revalidated
+        self.cache_size = 50 # Maximum size of the cache in MB
+
+        # Multi-state fetching
+        self.session = None
+        self.fetch_states = None # List of states fetched concurrently by `--states`
+        self.workers = 8 # Maximum number of requests in flight
+        self.retries = 3 # Retries (with backoff) per request
+        self.timeout = 30 # Seconds before a request is abandoned
+        self.use_async = False # Route requests through AsyncFetcher
+        self.fetcher = None
+        self.per_host = None # Connections per host for `--async` (Default: workers)
+        self.rate_limit = 0 # Requests per second per host for `--async` (0 = unlimited)
+        self.datasets = {} # Parsed columns per state ('us' for national data)
+        self.stream = False # Decode responses incrementally (see parseStream)
+        self.stream_block = 4096 # Records decoded before they are written to the columns
+        self.bulk = False # Fetch every state from /states/<date>.json in one request
+
+        # Data quality (see validateStates)
+        self.validate = None # report, mask or repair
+        self.spike_factor = 5.0 # Standard deviations above the trailing mean
+        self.spike_window = 14 # Days in the trailing window
+
+        # Projections (see projectStates)
+        self.project_metrics = None # Keywords to project, e.g. ['nc', 'nd']
+        self.project_window = 21 # Days the log-linear fit uses
+        self.project_days = 14 # Days extrapolated
+        self.projections = {} # state -> kwd -> {"dates", "values", "growth", "doubling"}
+
+        # Binary snapshots (see saveSnapshot/loadSnapshot)
+        self.snapshot_save = None
+        self.snapshot_load = None
+        self.incremental = False # Set by `--update`
+
+        # Arrow/Parquet hand-off (see exportArrow/importArrow)
+        self.arrow_export = None
+        self.arrow_import = None
+
+        # Cross-state aggregation (see aggregateStates/rankStates)
+        self.sum_states = False
+        self.rollups = None # Census regions to sum
+        self.rank_metric = None
+        self.rank_top = 10
+        self.rank_window = 1 # Days averaged (ending on the latest date) when ranking
+
+        # Instrumentation (see Profiler)
+        self.profile_report = None # JSON report written at the end of run()
+        self.profile_allocations = False
+        self.profiler = None
+
+        # Server mode (see serve)
+        self.serve_port = None
+        self.serve_host = "127.0.0.1"
+        self.refresh_interval = 3600 # Seconds between background refreshes
+        self.served = {} # Series published to the server, swapped on refresh
         self.data_type = 'state'
         self.state = 'ut'
         self.delim = ','
@@ -255,12 +800,19 @@ class CovidTracker(object):
         self.plot = False
         self.print_all = False
         self.print = False
+        self.print_format = 'table' # table, csv or tsv
+        self.print_output = None # File printed data is written to (Default: stdout)
+        self.print_started = False # Whether the header/file has been written yet
+        self.print_stream = None # Real stdout while CSV/TSV owns it and other output goes to stderr (see run)
 
         # Argument for handling the last # of data points to print
         self.modifier = None
+        # Date range to show (np.datetime64, inclusive). See applyModifier
+        self.date_from = None
+        self.date_to = None
 
         # Plotting formatting
-        self.chart_title = "Utah COVID-19 Cases\nData sources: https://covidtracking.com/api (via https://coronavirus-dashboard.utah.gov/)"
+        self.chart_title = None # Default: named after the plotted dataset (see getChartTitle)
         self.y_axis_title = "Total"
         self.x_axis_title = "Date"
         self.legend_location = "upper left"
@@ -269,203 +821,64 @@ class CovidTracker(object):
         self.x_index = [] # IDX for labeling the x axis (Dates)
         self.x_labels = [] # Dates to place on the x axis
         self.width = 0.8 # Approx width of the bars
+        self.bar_mode = 'overlap' # overlap, stack or group (see drawChart)
+        self.bin_size = 'auto' # auto, none, week, month, peaks or a number of days
+        self.bin_starts = None # First index of each plotted bin (None = daily)
+        self.bin_label = None # e.g. 'weekly', appended to the x axis title
         self.num_dates = 5 # Total Number of dates printed on plot
         self.length = 12 # Length of the graph in inches
         self.height = 6 # Length of the graph in inches
         self.figsize = (self.length, self.height) # Tuple passed to plt.figure()
 
+        # Headless rendering (see saveChart/renderBatch)
+        self.output_dir = None # Charts are written here instead of shown
+        self.output_format = 'png'
+        self.chart_name = None # Replaces the metric keywords in saved chart names (see `--name`)
+        self.figure = None # Figure reused between saved charts
+        self.batch_sets = None # Metric sets rendered for every state by `--batch`
+        self.processes = None # Size of the batch process pool (Default: CPU count)
+        self.jobs_file = None # Job file run by runJobs (see `--jobs`)
+
+        # Live updating (see watch)
+        self.watch_interval = None # Seconds between polls while watching a chart
+        self.bar_artists = {} # kwd -> PolyCollection drawn by drawChart
+        self.projection_lines = {} # kwd -> Line2D drawn by drawProjections
+        self.background = None # Canvas without the animated artists, for blitting
+
         # Full Parsed Data
         #   This data will be processed and placed in chronological order
         self.data = {
             "dates":{
-                "data": np.array([], dtype='object'),
+                "data": np.array([], dtype='datetime64[D]'),
+                "api_field": "date",
                 "title": "Dates",
                 "plot": False,
                 "print": False,
                 "is_plottable": False,
                 "is_printable": True,
-            },
-            "active_cases":{
-                "data": np.array([], dtype='int64'),
-                "title": "Active Cases",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["active_cases", "ac"]
-            },
-            "negative":{
-                "data": np.array([], dtype='int64'),
-                "title": "Negative Cases",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "green",
-                "color_type": "good",
-                "keywords": ["negative", "ng"]
-            },
-            "hospitalized":{
-                "data": np.array([], dtype='int64'),
-                "title": "Currently Hospitalized",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["hospitalized", "ch"]
-            },
-            "total_hospitalized":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total Hospitalized",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["total_hospitalized", "th"]
-            },
-            "in_icu":{
-                "data": np.array([], dtype='int64'),
-                "title": "Currently in ICU",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["in_icu", "ci"]
-            },
-            "total_in_icu":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total in ICU",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["total_in_icu", "ti"]
-            },
-            "on_ventilator":{
-                "data": np.array([], dtype='int64'),
-                "title": "New on Ventilator",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["on_ventilator", "cv"]
-            },
-            "total_on_ventilator":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total on Ventilator",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["total_on_ventilator", "tv"]
-            },
-            "total_recovered":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total Recovered",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "green",
-                "color_type": "green",
-                "keywords": ["total_recovered", "tr"]
-            },
-            "total_deaths":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total Deaths",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["total_deaths", "td"]
-            },
-            "total_tested":{
-                "data": np.array([], dtype='int64'),
-                "title": "Total Tested",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "goldenrod",
-                "color_type": "neutral",
-                "keywords": ["total_tested", "tt"]
-            },
-            "pos_neg":{
-                "data": np.array([], dtype='int64'),
-                "title": "Pos/Neg",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "goldenrod",
-                "color_type": "neutral",
-                "keywords": ["pos_neg", "pn"]
-            },
-            "new_deaths":{
-                "data": np.array([], dtype='int64'),
-                "title": "New Deaths",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["new_deaths", "nd"]
-            },
-            "new_hospitalized":{
-                "data": np.array([], dtype='int64'),
-                "title": "New Hospitalized",
-                "plot": False,
-                "print": False,
-                "is_plottable": True,
-                "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["new_hospitalized", "nh"]
-            },
-            "new_cases":{
-                "data": np.array([], dtype='int64'),
-                "title": "New Cases",
+            }
+        }
+        for metric in METRICS:
+            self.data[metric["key"]] = {
+                "data": np.array([], dtype=metric["dtype"]),
+                "title": metric["title"],
                 "plot": False,
                 "print": False,
                 "is_plottable": True,
                 "is_printable": True,
-                "bottom": None,
-                "color": "red",
-                "color_type": "bad",
-                "keywords": ["new_cases", "nc"]
+                "color": metric["color"],
+                "color_type": metric["color_type"],
+                "bin": metric.get("bin", "last"),
+                "keywords": [metric["key"], metric["short"]]
             }
-        }
+            for opt in ["api_field", "derive", "cumulative", "increase_of"]:
+                if opt in metric:
+                    self.data[metric["key"]][opt] = metric[opt]
+        self.keyword_index = {kw: kwd for kwd, info in self.data.items() for kw in info.get("keywords", [])}
+        # Parsed series in the order of their bit in a dataset's `nulls` column
+        self.null_fields = [kwd for kwd, info in self.data.items() if "api_field" in info and kwd != "dates"]
+        # Declared dtypes: useDataset may swap in masked (float64) columns, so parsers must not use those
+        self.dtypes = {kwd: info["data"].dtype for kwd, info in self.data.items()}
 
     def processCliArgs(self, cli_args): #DONE
         for i, arg in enumerate(cli_args):
@@ -477,6 +890,7 @@ class CovidTracker(object):
 
             elif arg in ['-all', '--printall']: # Prints all data
                 self.print_all = True
+                self.print = True
 
             elif arg in ['-p', '--plot']: #NOT FUNCTIONAL
                 print("Non Functional, Yo...")
@@ -485,11 +899,19 @@ class CovidTracker(object):
                     pass
 
             elif arg in ["-st",  "--stack"]: # Toggles whether to stack bar graphs
-                print("Non Functional")
-                pass
+                self.bar_mode = 'overlap' if self.bar_mode == 'stack' else 'stack'
+
+            elif arg in ['-bn', '--bin']: # Declares how long charts are downsampled
+                val = cli_args[i+1].lower()
+                if val not in ['auto', 'none', 'day', 'week', 'month', 'peaks'] and \
+                        not (val.isdigit() and int(val) > 0):
+                    sys.exit(f"ERROR with `{arg}`: {val} is not auto, none, week, month, peaks or a number of days.")
+                self.bin_size = int(val) if val.isdigit() else val
+
+            elif arg in ["-gr",  "--group"]: # Toggles whether to group bars side by side
+                self.bar_mode = 'overlap' if self.bar_mode == 'group' else 'group'
 
             elif '--plot=' in arg or '--cplot=' in arg or '--print=' in arg: # Toggles custom plotting
-                bottom = None
                 color = None
                 cplot = False
                 if "print" in arg:
@@ -514,11 +936,6 @@ class CovidTracker(object):
                     if cplot:
                         opt, color = opt.strip().split(":")
                     self.processFlag(opt, typ, color=color)
-                    # if self.stack_bars:
-                    #     if bottom is not None:
-                    #         bottom = f", {opt}"
-                    #     else:
-                    #         bottom = opt
 
             elif arg in ['-l', '--last']: # Declares the last # of data points to print
                 val = cli_args[i+1]
@@ -541,8 +958,201 @@ class CovidTracker(object):
             elif arg in ['-S', '--state']: # Declares state (Default: 'UT')
                 self.state = cli_args[i+1].lower()
 
+            elif arg in ['-SS', '--states']: # Declares several states to fetch at once (`all` or `ut,ca,ny`)
+                opt = cli_args[i+1].lower()
+                if opt == 'all':
+                    self.fetch_states = list(self.states)
+                else:
+                    self.fetch_states = [st.strip() for st in opt.split(self.delim)]
+                for st in self.fetch_states:
+                    if st not in self.states:
+                        sys.exit(f"ERROR with `{arg}`: {st} is not a valid state.")
+
+            elif arg in ['-W', '--workers']: # Declares the maximum number of requests in flight
+                try:
+                    self.workers = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+
+            elif arg in ['-R', '--retries']: # Declares the number of retries per request
+                try:
+                    self.retries = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+
+            elif arg in ['-A', '--async']: # Fetches through the asyncio (aiohttp) client
+                self.use_async = True
+
+            elif arg in ['-T', '--timeout']: # Declares the per-request timeout in seconds
+                try:
+                    self.timeout = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
+            elif arg in ['--per-host']: # Declares the connections per host for `--async`
+                try:
+                    self.per_host = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+
+            elif arg in ['--rate']: # Declares the requests per second per host for `--async`
+                try:
+                    self.rate_limit = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
+            elif arg in ['-sv', '--save']: # Saves the parsed data to a binary snapshot file
+                self.snapshot_save = cli_args[i+1]
+
+            elif arg in ['-ld', '--load']: # Loads data from a snapshot file instead of the API
+                self.snapshot_load = cli_args[i+1]
+
+            elif arg in ['-U', '--update']: # Updates a snapshot file with only the newest data
+                self.snapshot_load = cli_args[i+1]
+                self.snapshot_save = cli_args[i+1]
+                self.incremental = True
+
+            elif arg in ['-o', '--output-dir']: # Saves charts to this directory instead of showing them
+                self.output_dir = cli_args[i+1]
+
+            elif arg in ['-N', '--name']: # Declares the saved chart's name (saved as <state>_<name>.<format>)
+                self.chart_name = cli_args[i+1]
+                if not self.chart_name or os.sep in self.chart_name:
+                    sys.exit(f"ERROR with `{arg}`: {self.chart_name} is not a valid file name.")
+
+            elif arg in ['-wt', '--watch']: # Keeps the chart open and updates it every N seconds
+                try:
+                    self.watch_interval = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+                if self.watch_interval <= 0:
+                    sys.exit(f"ERROR with `{arg}`: the interval must be positive.")
+
+            elif arg in ['-f', '--format']: # Declares the format of saved charts (png/svg)
+                self.output_format = cli_args[i+1].lower()
+                if self.output_format not in ['png', 'svg']:
+                    sys.exit(f"ERROR with `{arg}`: {self.output_format} is not a valid format.")
+
+            elif arg in ['-b', '--batch']: # Renders every metric set for every state (`nc;nc7,nd7;pr`)
+                self.batch_sets = [opts.split(self.delim) for opts in cli_args[i+1].split(';')]
+                if self.output_dir is None:
+                    self.output_dir = "charts"
+
+            elif arg in ['-P', '--processes']: # Declares the size of the batch process pool
+                try:
+                    self.processes = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+
+            elif arg in ['-sp', '--serve']: # Serves the data over a local HTTP/JSON API on this port
+                try:
+                    self.serve_port = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid port.")
+
+            elif arg in ['-H', '--host']: # Declares the address the server binds to
+                self.serve_host = cli_args[i+1]
+
+            elif arg in ['-r', '--refresh']: # Declares seconds between background refreshes
+                try:
+                    self.refresh_interval = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
+            elif arg in ['-sm', '--stream']: # Decodes responses incrementally to bound memory
+                self.stream = True
+
+            elif arg in ['-BK', '--bulk']: # Fetches every state in one request
+                self.bulk = True
+
+            elif arg in ['-V', '--validate']: # Checks the loaded data: report, mask or repair
+                val = cli_args[i+1].lower()
+                if val not in ['report', 'mask', 'repair']:
+                    sys.exit(f"ERROR with `{arg}`: {val} is not report, mask or repair.")
+                self.validate = val
+
+            elif arg in ['-sf', '--spike-factor']: # Declares the standard deviations that make a spike
+                try:
+                    self.spike_factor = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
+            elif arg in ['-G', '--sum-states']: # Sums the loaded states into one dataset (`sum`)
+                self.sum_states = True
+
+            elif arg in ['-RG', '--region']: # Sums states by census region (`all` or `west,south`)
+                opt = cli_args[i+1].lower()
+                if opt == 'all':
+                    self.rollups = list(self.census_regions)
+                else:
+                    self.rollups = [r.strip() for r in opt.split(self.delim)]
+                for region in self.rollups:
+                    if region not in self.census_regions:
+                        sys.exit(f"ERROR with `{arg}`: {region} is not a valid region.")
+
+            elif arg in ['-rk', '--rank']: # Ranks the states by this metric
+                self.rank_metric = cli_args[i+1]
+
+            elif arg in ['-J', '--jobs']: # Runs every job in a JSON/TOML/YAML job file
+                self.jobs_file = cli_args[i+1]
+
+            elif arg in ['-pj', '--project']: # Projects these metrics for every loaded state
+                self.project_metrics = [opt.strip().lower() for opt in cli_args[i+1].split(self.delim)]
+
+            elif arg in ['-pw', '--project-window']: # Declares the days the projection fit uses
+                try:
+                    self.project_window = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+                if self.project_window < 2:
+                    sys.exit(f"ERROR with `{arg}`: the fit needs at least 2 days.")
+
+            elif arg in ['-ph', '--project-days']: # Declares the days projected
+                try:
+                    self.project_days = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+                if self.project_days < 1:
+                    sys.exit(f"ERROR with `{arg}`: at least 1 day must be projected.")
+
+            elif arg in ['-tk', '--top']: # Declares how many states `--rank` lists
+                try:
+                    self.rank_top = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+                if self.rank_top < 1:
+                    sys.exit(f"ERROR with `{arg}`: must be at least 1.")
+
+            elif arg in ['-rw', '--rank-window']: # Declares the days averaged by `--rank`
+                try:
+                    self.rank_window = int(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid integer.")
+                if self.rank_window < 1:
+                    sys.exit(f"ERROR with `{arg}`: must be at least 1.")
+
+            elif arg in ['-pr', '--profile-report']: # Writes per-stage timings and counters to this JSON file
+                self.profile_report = cli_args[i+1]
+
+            elif arg in ['-pa', '--profile-allocations']: # Adds tracemalloc peaks to the profile report (slower)
+                self.profile_allocations = True
+
+            elif arg in ['-pf', '--print-format']: # Declares how printed data is formatted (table/csv/tsv)
+                self.print_format = cli_args[i+1].lower()
+                if self.print_format not in ['table', 'csv', 'tsv']:
+                    sys.exit(f"ERROR with `{arg}`: {self.print_format} is not a valid format.")
+
+            elif arg in ['-po', '--print-output']: # Writes printed data to this file instead of stdout
+                self.print_output = cli_args[i+1]
+
+            elif arg in ['-ea', '--export-arrow']: # Writes the parsed data to a Parquet/Arrow file
+                self.arrow_export = cli_args[i+1]
+
+            elif arg in ['-ia', '--import-arrow']: # Loads data from a Parquet/Arrow file instead of the API
+                self.arrow_import = cli_args[i+1]
+
             elif arg in ['-mt', '--main-title']: # Declares Main Graph Title (Put in quotes)
-                self.y_axis_title = cli_args[i+1]
+                self.chart_title = cli_args[i+1]
 
             elif arg in ['-yt', '--y-title']: # Declares Y Axis Title
                 self.y_axis_title = cli_args[i+1]
@@ -570,13 +1180,45 @@ class CovidTracker(object):
                     sys.exit(f"ERROR with `{arg}`: {self.data_type} is not a valid data type.")
 
             elif arg in ['-d', '--date']: # Declares the specific date
-                date = cli_args[i + 1]
+                date = self.parseDateArg(arg, cli_args[i + 1])
+                self.date_from = date
+                self.date_to = date
                 self.plot_all = False # Don't plot if it's only one date
 
+            elif arg in ['-fr', '--from']: # Declares the first date to show (YYYYMMDD or YYYY-MM-DD)
+                self.date_from = self.parseDateArg(arg, cli_args[i + 1])
+
+            elif arg in ['-to', '--to']: # Declares the last date to show (YYYYMMDD or YYYY-MM-DD)
+                self.date_to = self.parseDateArg(arg, cli_args[i + 1])
+
             elif arg in ['-df',  '--date-format']: # Declares the date format (Default: YYYYDDMM)
                 print("Not Functional Yet")
                 pass
 
+            elif arg in ['-B', '--base-url']: # Declares the API base url (e.g. a local mirror)
+                self.base_url = cli_args[i+1].rstrip('/')
+
+            elif arg in ['-nc', '--no-cache']: # Disables the response cache
+                self.use_cache = False
+
+            elif arg in ['-O', '--offline']: # Only serves responses from the cache
+                self.offline = True
+
+            elif arg in ['-cd', '--cache-dir']: # Declares the response cache directory
+                self.cache_dir = cli_args[i+1]
+
+            elif arg in ['-ct', '--cache-ttl']: # Declares seconds before cached responses are revalidated
+                try:
+                    self.cache_ttl = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
+            elif arg in ['-cs', '--cache-size']: # Declares the maximum cache size in MB
+                try:
+                    self.cache_size = float(cli_args[i+1])
+                except:
+                    sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} is not a valid number.")
+
             elif arg in ['-xy', '--size']: # Declares length & height of the graph window
                 try:
                     x, y = cli_args[i+1].split('x')
@@ -585,61 +1227,26 @@ class CovidTracker(object):
                 except:
                     sys.exit(f"ERROR with `{arg}`: {cli_args[i+1]} must have format 3x5.")
 
-    def processFlag(self, opt, typ, color=None, bottom=None):
-        if opt in self.data["active_cases"]["keywords"]:
-            self.setPrintPlotInfo("active_cases", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["negative"]["keywords"]:
-            self.setPrintPlotInfo("negative", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["hospitalized"]["keywords"]:
-            self.setPrintPlotInfo("hospitalized", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["total_hospitalized"]["keywords"]:
-            self.setPrintPlotInfo("total_hospitalized", typ, color=color, bottom=bottom)
+    def parseDateArg(self, arg, val):
+        try:
+            if len(val) == 8 and val.isdigit():
+                val = f"{val[:4]}-{val[4:6]}-{val[6:]}"
+            return np.datetime64(val, 'D')
+        except ValueError:
+            sys.exit(f"ERROR with `{arg}`: {val} is not a valid date (YYYYMMDD).")
 
-        elif opt in self.data["in_icu"]["keywords"]:
-            self.setPrintPlotInfo("in_icu", typ, color=color, bottom=bottom)
+    def processFlag(self, opt, typ, color=None):
+        kwd = self.keyword_index.get(opt)
+        if kwd is not None:
+            self.setPrintPlotInfo(kwd, typ, color=color)
 
-        elif opt in self.data["total_in_icu"]["keywords"]:
-            self.setPrintPlotInfo("total_in_icu", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["on_ventilator"]["keywords"]:
-            self.setPrintPlotInfo("on_ventilator", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["total_on_ventilator"]["keywords"]:
-            self.setPrintPlotInfo("total_on_ventilator", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["total_recovered"]["keywords"]:
-            self.setPrintPlotInfo("total_recovered", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["total_deaths"]["keywords"]:
-            self.setPrintPlotInfo("total_deaths", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["total_tested"]["keywords"]:
-            self.setPrintPlotInfo("total_tested", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["pos_neg"]["keywords"]:
-            self.setPrintPlotInfo("pos_neg", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["new_deaths"]["keywords"]:
-            self.setPrintPlotInfo("new_deaths", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["new_hospitalized"]["keywords"]:
-            self.setPrintPlotInfo("new_hospitalized", typ, color=color, bottom=bottom)
-
-        elif opt in self.data["new_cases"]["keywords"]:
-            self.setPrintPlotInfo("new_cases", typ, color=color, bottom=bottom)
-
-    def setPrintPlotInfo(self, kwd, typ, color=None, bottom=None):
+    def setPrintPlotInfo(self, kwd, typ, color=None):
         if typ == 'print':
             if self.data[kwd]["is_printable"]:
                 self.data[kwd]["print"] = True
         else:
             if self.data[kwd]["is_plottable"]:
                 self.data[kwd]["plot"] = True
-                if bottom is not None:
-                    self.data[kwd]["bottom"] = bottom
         if color:
             self.data[kwd]["color"] = color
 
@@ -648,6 +1255,9 @@ class CovidTracker(object):
         for color, data in self.colors.items():
             if not data["is_used"] and data["color_type"] == self.data[kwd]["color_type"]:
                 possible_colors.append(color)
+        if not possible_colors: # Every color of this type is taken (many series)
+            possible_colors = [c for c, data in self.colors.items() if not data["is_used"]] or \
+                              [c for c in self.colors if c != "invalid_color"]
         color = random.choice(possible_colors)
         self.data[kwd]["color"] = color
         self.setColorAsUsed(color)
@@ -656,47 +1266,361 @@ class CovidTracker(object):
         self.colors[color]["is_used"] = True
 
     def setFigsize(self): #DONE
-        figsize = (self.length, self.height)
+        self.figsize = (self.length, self.height)
 
     def setStyle(self): #DONE
+        importPlotting()
         mpl.style.use(self.style)
 
-    def insert(self, dct, kwd, value_kwd, pos=0): #DONE
-        value = self.getVal(dct, value_kwd)
-        if kwd == 'dates':
-            value = self.formatDate(value)
-        self.data[kwd]['data'] = np.insert(self.data[kwd]['data'], pos, value)
+    def getCache(self):
+        if self.cache is None and self.use_cache:
+            self.cache = ResponseCache(self.cache_dir, ttl=self.cache_ttl,
+                                       max_bytes=int(self.cache_size * 1024 * 1024))
+        return self.cache
+
+    def getSession(self):
+        """
+        Pooled session shared by every request (keep-alive, retry with backoff)
+        """
+        if self.session is None:
+            importRequests()
+            try:
+                retry = Retry(total=self.retries, backoff_factor=0.5, backoff_jitter=0.25,
+                              status_forcelist=[429, 500, 502, 503, 504])
+            except TypeError: # urllib3 < 2 has no jitter
+                retry = Retry(total=self.retries, backoff_factor=0.5,
+                              status_forcelist=[429, 500, 502, 503, 504])
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers,
+                                  max_retries=retry)
+            self.session = requests.Session()
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def getFetcher(self):
+        if self.fetcher is None:
+            self.fetcher = AsyncFetcher(per_host=self.per_host or self.workers, rate=self.rate_limit,
+                                        timeout=self.timeout, retries=self.retries)
+        return self.fetcher
+
+    def closeFetcher(self):
+        if self.fetcher is not None:
+            self.fetcher.close()
+            self.fetcher = None
+
+    def httpGet(self, url, headers=None):
+        """
+        One GET through the async client (`--async`) or the pooled session.
+        Transport errors, including exhausted retries, raise FetchError.
+        """
+        if self.use_async:
+            return self.getFetcher().get(url, headers)
+        try:
+            return self.getSession().get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise FetchError(f"Could not fetch `{url}`: {e}") from e
+
+    def fetch(self, url):
+        """
+        GETs `url` and returns the response body as bytes, going through the
+        response cache unless it is disabled
+        """
+        cache = self.getCache()
+        if cache is None:
+            if self.offline:
+                sys.exit("ERROR: `--offline` requires the response cache")
+            r = self.httpGet(url)
+            self.profiler.count("bytes_downloaded", len(r.content))
+            if r.status_code != 200:
+                raise FetchError(f"Could not fetch `{url}`: status code {r.status_code}")
+            return r.content
+
+        body, meta = cache.lookup(url)
+        if body is not None and (self.offline or cache.isFresh(meta)):
+            cache.hits += 1
+            self.profiler.count("cache_hits")
+            cache.markUsed(url)
+            return body
+        if self.offline:
+            sys.exit(f"ERROR: `{url}` is not cached and `--offline` is set.")
+
+        r = self.httpGet(url, headers=cache.getValidators(meta))
+        self.profiler.count("bytes_downloaded", len(r.content))
+        if r.status_code == 304 and body is not None:
+            cache.revalidated += 1
+            self.profiler.count("cache_revalidated")
+            cache.refresh(url, meta)
+            return body
+        cache.misses += 1
+        self.profiler.count("cache_misses")
+        if r.status_code != 200:
+            if body is not None:
+                print(f"ERROR: Status code {r.status_code} for `{url}`. Serving stale cached response.")
+                return body
+            raise FetchError(f"Could not fetch `{url}`: status code {r.status_code}")
+        cache.store(url, r.content, r.headers)
+        return r.content
+
+    def fetchStream(self, url, chunk_size=65536):
+        """
+        Like fetch() but yields the body in chunks as it arrives instead of
+        holding the whole response in memory
+        """
+        cache = self.getCache()
+        meta = cache.lookupMeta(url) if cache is not None else None
+        if meta is not None and (self.offline or cache.isFresh(meta)):
+            cache.hits += 1
+            self.profiler.count("cache_hits")
+            cache.markUsed(url)
+            yield from cache.iterBody(url, chunk_size)
+            return
+        if self.offline:
+            sys.exit(f"ERROR: `{url}` is not cached and `--offline` is set.")
+
+        headers = cache.getValidators(meta) if cache is not None else {}
+        try:
+            r = self.getSession().get(url, headers=headers, stream=True, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise FetchError(f"Could not fetch `{url}`: {e}") from e
+        with r:
+            if r.status_code == 304 and meta is not None:
+                cache.revalidated += 1
+                self.profiler.count("cache_revalidated")
+                cache.refresh(url, meta)
+                yield from cache.iterBody(url, chunk_size)
+                return
+            if r.status_code != 200:
+                raise FetchError(f"Could not fetch `{url}`: status code {r.status_code}")
+            chunks = r.iter_content(chunk_size=chunk_size)
+            if cache is not None:
+                cache.misses += 1
+                self.profiler.count("cache_misses")
+                chunks = cache.storeChunks(url, chunks, r.headers)
+            try:
+                for chunk in chunks:
+                    self.profiler.count("bytes_downloaded", len(chunk))
+                    yield chunk
+            finally:
+                # iterRecords stops at the closing `]`: read the rest so the cache entry is committed
+                if cache is not None:
+                    try:
+                        for chunk in chunks:
+                            self.profiler.count("bytes_downloaded", len(chunk))
+                    except Exception:
+                        pass # storeChunks has dropped the partial body
 
     def makeRequest(self, method='GET', return_type='json'): #DONE
         if self.url is None:
             self.generateUrl()
             # sys.exit("Error: No URL is set!")
+        if method == 'GET' and return_type in ['json', 'text']:
+            body = self.fetch(self.url)
+            if return_type == 'json':
+                return json.loads(body)
+            return body.decode()
+        importRequests()
         if method == 'POST':
             r = requests.post(self.url)
         else:
             r = requests.get(self.url)
         if r.status_code != 200:
             print("ERROR: Status code is not 200")
-        if return_type == 'json':
-            return r.json()
-        if return_type == 'text':
-            return r.text
-        else:
-            return r
+        return r
 
     def generateUrl(self, format='json'): #DONE
         # Comment Line
         if self.data_type == 'national':
             self.url = f"{self.base_url}/us/{self.date}.{format}"
         else:
-            self.url = f"{self.base_url}/states/{self.state}/{self.date}.{format}"
+            self.url = self.generateStateUrl(self.state, format=format)
+
+    def generateStateUrl(self, state, format='json', date=None):
+        # `us` is the key national data is stored under
+        date = date or self.date
+        if state == 'us':
+            return f"{self.base_url}/us/{date}.{format}"
+        return f"{self.base_url}/states/{state}/{date}.{format}"
+
+    def generateBulkUrl(self, format='json'):
+        # Every state in one document: /states/daily.json or /states/current.json
+        return f"{self.base_url}/states/{self.date}.{format}"
+
+    def fetchStates(self, states):
+        """
+        Fetches `states` concurrently (at most `self.workers` in flight) and
+        parses each response into self.datasets[state]. With `--bulk` they
+        all come from one request instead (see fetchBulk).
+        """
+        if self.bulk:
+            missing = set(states) - set(self.fetchBulk(states))
+            for state in sorted(missing):
+                print(f"ERROR: No data for `{state}` in `{self.generateBulkUrl()}`.")
+            return
+        self.datasets.update(self.fetchUrls({st: self.generateStateUrl(st) for st in states}))
+
+    def fetchUrls(self, urls):
+        """
+        Fetches and parses `urls` ({key: url}) concurrently, at most
+        `self.workers` in flight. Returns {key: columns} for the ones that worked.
+        """
+        self.getSession()
+        if self.use_async:
+            self.getFetcher() # Created once here, not racily in the workers
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetchColumns, url): key for key, url in urls.items()}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except FetchError as e:
+                    print(f"ERROR: {e}")
+        return results
+
+    def fetchBulk(self, states=None):
+        """
+        Downloads every state's history in one request, parses it in one pass
+        and splits it into self.datasets by state. Only `states` are kept
+        (Default: all of them). Returns the states stored.
+        """
+        if self.date not in ['daily', 'current']:
+            sys.exit(f"ERROR: `--bulk` only supports `daily` and `current` data, not `{self.date}`.")
+        url = self.generateBulkUrl()
+        if self.stream:
+            codes = []
+            def tagged(records):
+                for record in records:
+                    codes.append(record.get("state") or "")
+                    yield record
+            columns = self.parseStreamColumns(tagged(self.iterRecords(self.fetchStream(url))))
+            codes = np.array(codes[::-1], dtype='U2')
+        else:
+            data = json.loads(self.fetch(url))
+            if type(data) is dict:
+                data = [data]
+            columns = self.parseColumns(data)
+            codes = np.fromiter((d.get("state") or "" for d in reversed(data)), dtype='U2', count=len(data))
+        names, codes = np.unique(np.char.lower(codes), return_inverse=True)
+        return self.splitStates(codes, names.tolist(), columns, states)
+
+    def splitStates(self, codes, names, columns, states=None):
+        """
+        Splits long `columns` (rows of every state, in any order) into one
+        chronological dataset per state with a single lexsort. `codes` index
+        `names`. Only `states` are kept (Default: all). Returns the states stored.
+        """
+        dates = columns["dates"]
+        order = np.lexsort((dates, codes))
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        loaded = []
+        for rows in np.split(order, bounds) if len(order) else []:
+            state = names[codes[rows[0]]]
+            if states is not None and state not in states:
+                continue
+            self.datasets[state] = {kwd: values[rows] for kwd, values in columns.items()}
+            loaded.append(state)
+        return loaded
+
+    def fetchColumns(self, url):
+        # Download and parsing are profiled as separate stages, streamed or not
+        stage = self.profiler.stage
+        if self.stream:
+            fetching = stage("fetch")
+            with stage("parse", exclude=fetching):
+                return self.parseStreamColumns(self.iterRecords(fetching.iterate(self.fetchStream(url))))
+        with stage("fetch"):
+            body = self.fetch(url)
+        with stage("parse"):
+            return self.parseColumns(json.loads(body))
+
+    def getMissingDates(self, last, current):
+        """
+        Returns the dates strictly between `last` and `current` (datetime64)
+        """
+        return np.arange(last + 1, current, dtype='datetime64[D]')
+
+    def updateDatasets(self, states):
+        """
+        Brings the stored datasets for `states` up to date by fetching only the
+        `current` record, the last stored date and any dates missing in between
+        """
+        report = {}
+        for state in states:
+            if state not in self.datasets or len(self.datasets[state]["dates"]) == 0:
+                body = self.fetch(self.generateStateUrl(state, date='daily'))
+                self.datasets[state] = self.parseColumns(json.loads(body))
+                report[state] = f"fetched full history ({len(self.datasets[state]['dates'])} dates)"
+                continue
+            records = json.loads(self.fetch(self.generateStateUrl(state, date='current')))
+            if type(records) is dict:
+                records = [records]
+            last = self.datasets[state]["dates"][-1]
+            current = self.datesFromInts([max(r["date"] for r in records)])[0]
+            # The newest stored record is often revised the next day, so refetch it too
+            refetch = list(self.getMissingDates(last, current))
+            if last < current:
+                refetch.append(last)
+            for date in refetch:
+                url = self.generateStateUrl(state, date=self.formatDateKey(date))
+                record = json.loads(self.fetch(url))
+                records.extend(record if type(record) is list else [record])
+            records.sort(key=lambda r: r["date"], reverse=True)
+            report[state] = self.upsertRows(state, self.parseColumns(records))
+        for state, summary in report.items():
+            print(f"{state}: {summary}")
+        return report
+
+    def upsertRows(self, state, rows):
+        """
+        Merges `rows` (columns keyed like self.datasets[state]) into the stored
+        dataset by date. Existing dates are overwritten, new ones are appended.
+        Returns a short summary of what changed.
+        """
+        old = self.datasets[state]
+        dates = old["dates"]
+        new_dates = rows["dates"]
+        idx = np.searchsorted(dates, new_dates)
+        exists = idx < len(dates)
+        exists[exists] = dates[idx[exists]] == new_dates[exists]
+
+        merged = {}
+        changed_dates = np.zeros(exists.sum(), dtype=bool)
+        values_changed = 0
+        for kwd, column in old.items():
+            new_column = rows[kwd]
+            diff = column[idx[exists]] != new_column[exists]
+            if kwd != "nulls": # A null filled in also changes its value, so it is counted there
+                changed_dates |= diff
+                values_changed += int(diff.sum())
+            merged[kwd] = np.concatenate([column, new_column[~exists]])
+            if diff.any():
+                merged[kwd][idx[exists][diff]] = new_column[exists][diff]
+        if (~exists).any() and len(dates) and new_dates[~exists].min() < dates[-1]:
+            order = np.argsort(merged["dates"], kind='stable')
+            merged = {kwd: column[order] for kwd, column in merged.items()}
+        self.datasets[state] = merged
+
+        added = [self.formatDateKey(d) for d in new_dates[~exists]]
+        summary = f"{len(added)} new date(s)"
+        if added:
+            summary += f" ({', '.join(added)})"
+        summary += f", {int(changed_dates.sum())} date(s) revised ({values_changed} value(s) changed)"
+        return summary
+
+    def useDataset(self, state):
+        if state != 'us':
+            self.state = state
+        for kwd, column in self.datasets[state].items():
+            if kwd in self.data:
+                self.data[kwd]["data"] = column
+        self.computeDerived()
 
     def formatDate(self, date, include_year=False): #DONE
-        date = str(date)
+        date = str(np.datetime64(date, 'D')) # YYYY-MM-DD
         if include_year:
-            return f"{date[4:6]}/{date[6:]}/{date[:4]}"
+            return f"{date[5:7]}/{date[8:]}/{date[:4]}"
         else:
-            return f"{date[4:6]}/{date[6:]}"
+            return f"{date[5:7]}/{date[8:]}"
 
     def getVal(self, dct, kwd): #DONE
         # Comment Line
@@ -705,83 +1629,525 @@ class CovidTracker(object):
         else:
             return dct[kwd] or 0
 
-    def parse(self, data): #DONE?
-        # Comment Line
+    def parseColumns(self, data):
+        """
+        Converts API records (newest first) into chronological typed columns.
+        Each column is allocated once and filled by walking the records in reverse.
+        """
         if type(data) is dict:
             data = [data]
-        for d in data:
-            self.insert(d, "dates", "date")
-            self.insert(d, "active_cases", "positive")
-            self.insert(d, "negative", "negative")
-            self.insert(d, "hospitalized", "hospitalizedCurrently")
-            self.insert(d, "total_hospitalized", "hospitalizedCumulative")
-            self.insert(d, "in_icu", "inIcuCurrently")
-            self.insert(d, "total_in_icu", "inIcuCumulative")
-            self.insert(d, "on_ventilator", "onVentilatorCurrently")
-            self.insert(d, "total_on_ventilator", "onVentilatorCumulative")
-            self.insert(d, "total_recovered", "recovered")
-            self.insert(d, "total_deaths", "death")
-            self.insert(d, "total_tested", "total")
-            self.insert(d, "pos_neg", "posNeg")
-            self.insert(d, "new_deaths", "deathIncrease")
-            self.insert(d, "new_hospitalized", "hospitalizedIncrease")
-            self.insert(d, "new_cases", "positiveIncrease")
-
-    def printDataOLD(self, data): # Don't run this yet. It doesn't work...
-        if print_total or print_current or print_accum or print_all:
-            print(f"Date: {date}")
-        if print_total or print_all:
-            print(f"""TOTALS:
-    Total Positive:         {positive}
-    Total Deaths:           {deaths}
-    Total Recovered:        {recovered}
-    Total Hospitalized:     {hospitalized}
-    Total ICU:              {inIcuCumulative}
-    Total Ventilator:       {onVentilatorCumulative}
-""")
-        if print_current or print_all:
-            print(f"""Current:
-    Currently Hospitalized: {hospitalizedCurrently}
-    In ICU:                 {inIcuCurrently}
-""")
-        if print_accum or print_all:
-            print(f"""Accumulators:
-    On Ventilator:          {onVentilatorCurrently}
-    New Deaths:             {deathIncrease}
-    New Hospitalized:       {hospitalizedIncrease}
-    New Cases:              {positiveIncrease}
-""")
+        n = len(data)
+        self.profiler.count("records_parsed", n)
+        columns = {}
+        for kwd, info in self.data.items():
+            field = info.get("api_field")
+            if field is None:
+                continue
+            dtype = self.dtypes[kwd]
+            if dtype.kind == 'M':
+                columns[kwd] = self.datesFromInts(np.fromiter(
+                    (d.get(field) or 0 for d in reversed(data)), dtype='int64', count=n))
+            else:
+                columns[kwd] = np.fromiter(
+                    (NULL if (v := d.get(field)) is None else v for d in reversed(data)),
+                    dtype=dtype, count=n)
+        return self.extractNulls(columns)
+
+    def extractNulls(self, columns):
+        """
+        Replaces the NULL placeholders left by the parsers with 0 and records
+        them in columns["nulls"], one bit per series (see self.null_fields),
+        so missing values stay distinguishable from true zeros
+        """
+        nulls = np.zeros(len(columns["dates"]), dtype='uint32')
+        for bit, kwd in enumerate(self.null_fields):
+            missing = columns[kwd] == NULL
+            columns[kwd][missing] = 0
+            nulls |= missing.astype('uint32') << np.uint32(bit)
+        columns["nulls"] = nulls
+        return columns
+
+    def datesFromInts(self, values):
+        """
+        Converts YYYYMMDD integers (the API's date format) to datetime64[D]
+        """
+        values = np.asarray(values, dtype='int64')
+        years = (values // 10000 - 1970).astype('datetime64[Y]')
+        months = years.astype('datetime64[M]') + (values // 100 % 100 - 1)
+        return months.astype('datetime64[D]') + (values % 100 - 1)
+
+    def formatDateKey(self, date):
+        # datetime64 -> the API's YYYYMMDD
+        return str(np.datetime64(date, 'D')).replace('-', '')
+
+    def iterRecords(self, chunks):
+        """
+        Incrementally decodes a JSON array (or a single object) from byte
+        `chunks`, yielding one record at a time. Only the undecoded tail of
+        the body is kept in memory.
+        """
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        chunks = iter(chunks)
+        buf = ""
+        pos = 0
+        in_array = None
+        done = False
+        while True:
+            # Skip separators, then try to decode the next value
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                if in_array is None:
+                    in_array = buf[pos] == '['
+                    if in_array:
+                        pos += 1
+                        continue
+                if in_array and buf[pos] == ']':
+                    return
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if done:
+                        raise
+                else:
+                    yield record
+                    pos = end
+                    if not in_array:
+                        return
+                    continue
+            if done:
+                return
+            chunk = next(chunks, None)
+            if chunk is None:
+                done = True
+                buf = buf[pos:] + utf8.decode(b'', final=True)
+            else:
+                buf = buf[pos:] + utf8.decode(chunk)
+            pos = 0
+
+    def parseStreamColumns(self, records):
+        """
+        Writes `records` (newest first) into growing typed columns in blocks of
+        `self.stream_block`, then reverses them into chronological order
+        """
+        fields = {kwd: info["api_field"] for kwd, info in self.data.items() if "api_field" in info}
+        dtypes = {kwd: self.dtypes[kwd] for kwd in fields}
+        capacity = self.stream_block
+        columns = {kwd: np.empty(capacity, dtype='int64' if dtypes[kwd].kind == 'M' else dtypes[kwd])
+                   for kwd in fields}
+        n = 0
+        block = []
+
+        def flush():
+            nonlocal capacity
+            m = len(block)
+            if n + m > capacity:
+                capacity = max(capacity * 2, n + m)
+                for kwd in columns:
+                    grown = np.empty(capacity, dtype=columns[kwd].dtype)
+                    grown[:n] = columns[kwd][:n]
+                    columns[kwd] = grown
+            for kwd, field in fields.items():
+                if dtypes[kwd].kind == 'M':
+                    values = (d.get(field) or 0 for d in block)
+                else:
+                    values = (NULL if (v := d.get(field)) is None else v for d in block)
+                columns[kwd][n:n + m] = np.fromiter(values, dtype=columns[kwd].dtype, count=m)
+            block.clear()
+            return n + m
+
+        for record in records:
+            block.append(record)
+            if len(block) == self.stream_block:
+                n = flush()
+        n = flush()
+        self.profiler.count("records_parsed", n)
+        columns = {kwd: column[n - 1::-1].copy() if n else column[:0] for kwd, column in columns.items()}
+        for kwd, dtype in dtypes.items():
+            if dtype.kind == 'M':
+                columns[kwd] = self.datesFromInts(columns[kwd])
+        return self.extractNulls(columns)
+
+    def parseStream(self, records):
+        self.datasets[self.getDatasetKey()] = self.parseStreamColumns(records)
+        self.useDataset(self.getDatasetKey())
+
+    def parse(self, data): #DONE
+        self.datasets[self.getDatasetKey()] = self.parseColumns(data)
+        self.useDataset(self.getDatasetKey())
+
+    def computeDerived(self):
+        """
+        Fills every series with a `derive` entry: (method name, *arguments)
+        """
+        for kwd, info in self.data.items():
+            if "derive" in info:
+                method, *args = info["derive"]
+                info["data"] = getattr(self, method)(*args)
+
+    def rollingMean(self, kwd, window):
+        # Trailing mean from cumulative sums; the first window-1 days and masked (NaN) values average what exists
+        values = self.data[kwd]["data"].astype('float64')
+        valid = ~np.isnan(values)
+        sums = np.cumsum(np.where(valid, values, 0))
+        counts = np.cumsum(valid)
+        sums[window:] = sums[window:] - sums[:-window]
+        counts[window:] = counts[window:] - counts[:-window]
+        return np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+
+    def growthRate(self, kwd):
+        # Day-over-day percent change, 0 where the previous day is 0
+        values = self.data[kwd]["data"].astype('float64')
+        out = np.zeros_like(values)
+        if len(values) > 1:
+            prev = values[:-1]
+            np.divide(values[1:] - prev, prev, out=out[1:], where=prev != 0)
+        return out * 100
+
+    def percentage(self, numerator, denominator):
+        num = self.data[numerator]["data"].astype('float64')
+        den = self.data[denominator]["data"].astype('float64')
+        out = np.zeros_like(num)
+        np.divide(num, den, out=out, where=den != 0)
+        return out * 100
+
+    def perCapita(self, kwd, per=100000):
+        population = self.populations.get(self.getDatasetKey())
+        values = self.data[kwd]["data"].astype('float64')
+        if population is None:
+            return np.full_like(values, np.nan)
+        return values * (per / population)
+
+    def getDatasetKey(self):
+        if self.data_type == 'national':
+            return 'us'
+        return self.state
+
+    def getChartTitle(self):
+        # `-mt` if given, else named after the dataset being drawn (states and `us` upper case, groups capitalized)
+        if self.chart_title is not None:
+            return self.chart_title
+        key = self.getDatasetKey()
+        name = key.upper() if len(key) == 2 else key.title()
+        return f"{name} COVID-19 Cases\nData sources: https://covidtracking.com/api"
+
+    def saveSnapshot(self, path, states=None):
+        """
+        Writes the columns of `states` (Default: every dataset) to a versioned
+        binary file. Layout: magic, uint32 version, uint64 header length, JSON
+        header, then each column's raw bytes aligned to SNAPSHOT_ALIGN.
+        """
+        if states is None:
+            states = list(self.datasets)
+        layout = {}
+        offset = 0
+        for state in states:
+            columns = {}
+            for kwd, column in self.datasets[state].items():
+                column = np.ascontiguousarray(column)
+                columns[kwd] = {"dtype": column.dtype.str, "offset": offset}
+                offset += -(-column.nbytes // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+            length = len(next(iter(self.datasets[state].values()), []))
+            layout[state] = {"length": length, "columns": columns}
+        header = json.dumps({"version": SNAPSHOT_VERSION, "states": layout}).encode()
+        prefix = len(SNAPSHOT_MAGIC) + struct.calcsize("<IQ")
+        data_start = -(-(prefix + len(header)) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<IQ", SNAPSHOT_VERSION, len(header)))
+            f.write(header)
+            for state in states:
+                for kwd, info in layout[state]["columns"].items():
+                    f.seek(data_start + info["offset"])
+                    f.write(np.ascontiguousarray(self.datasets[state][kwd]).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp, path)
+
+    def loadSnapshot(self, path):
+        """
+        Memory-maps a file written by saveSnapshot. The columns placed in
+        self.datasets are read-only views of the mapping, so nothing is copied.
+        """
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    sys.exit(f"ERROR: `{path}` is not a CovidTracker snapshot.")
+                version, header_len = struct.unpack("<IQ", f.read(struct.calcsize("<IQ")))
+                if version > SNAPSHOT_VERSION:
+                    sys.exit(f"ERROR: `{path}` has snapshot version {version}, "
+                             f"only versions <= {SNAPSHOT_VERSION} are supported.")
+                header = json.loads(f.read(header_len))
+                prefix = len(SNAPSHOT_MAGIC) + struct.calcsize("<IQ")
+                data_start = -(-(prefix + header_len) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            for state, info in header["states"].items():
+                columns = {}
+                for kwd, col in info["columns"].items():
+                    columns[kwd] = np.frombuffer(buf, dtype=np.dtype(col["dtype"]),
+                                                 count=info["length"],
+                                                 offset=data_start + col["offset"])
+                if version < 2 and "dates" in columns:
+                    columns["dates"] = self.datesFromInts(columns["dates"])
+                self.datasets[state] = columns
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            sys.exit(f"ERROR: Could not load snapshot `{path}`: {e}")
+        return list(header["states"])
+
+    def importArrowModules(self):
+        # pyarrow is optional, only `--export-arrow`/`--import-arrow` need it
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            import pyarrow.feather
+        except ImportError:
+            sys.exit("ERROR: Arrow/Parquet support requires pyarrow (`pip install pyarrow`).")
+        return pyarrow
+
+    def exportArrow(self, path, states=None):
+        """
+        Writes `states` (Default: every dataset) as one long table with a
+        dictionary-encoded `state` column, a date32 `date` column and one typed
+        column per parsed series. Values the API left null (see extractNulls)
+        are Arrow nulls. `.parquet` files are Parquet, anything else is an
+        Arrow IPC (Feather v2) file. Both are zstd compressed.
+        """
+        pa = self.importArrowModules()
+        if states is None:
+            states = list(self.datasets)
+        kwds = [kwd for kwd, info in self.data.items() if "api_field" in info and kwd != "dates"]
+        lengths = [len(self.datasets[st]["dates"]) for st in states]
+        state_idx = np.repeat(np.arange(len(states), dtype='int32'), lengths)
+        concat = lambda kwd: np.concatenate([self.data[kwd]["data"][:0]] + [self.datasets[st][kwd] for st in states])
+        nulls = np.concatenate([np.zeros(0, dtype='uint32')] +
+                               [self.datasets[st].get("nulls", np.zeros(n, dtype='uint32'))
+                                for st, n in zip(states, lengths)])
+        table = pa.table({
+            "state": pa.DictionaryArray.from_arrays(state_idx, pa.array(states, pa.string())),
+            "date": pa.array(concat("dates"), pa.date32()),
+            **{kwd: pa.array(concat(kwd), mask=self.getNullMask(nulls, kwd)) for kwd in kwds}
+        })
+        if path.endswith(".parquet"):
+            pa.parquet.write_table(table, path, compression="zstd")
+        else:
+            pa.feather.write_feather(table, path, compression="zstd")
+
+    def importArrow(self, path):
+        """
+        Rebuilds self.datasets from a file written by exportArrow (or any
+        table with `state`, `date` and series columns) without calling the API
+        """
+        pa = self.importArrowModules()
+        if path.endswith(".parquet"):
+            table = pa.parquet.read_table(path)
+        else:
+            table = pa.feather.read_table(path)
+        if "state" not in table.column_names or "date" not in table.column_names:
+            sys.exit(f"ERROR: `{path}` needs `state` and `date` columns.")
+        states = table.column("state").combine_chunks()
+        if not pa.types.is_dictionary(states.type):
+            states = states.dictionary_encode()
+        codes = states.indices.to_numpy(zero_copy_only=False)
+        names = [str(st).lower() for st in states.dictionary.to_pylist()]
+        columns = {"dates": table.column("date").to_numpy().astype('datetime64[D]')}
+        columns["nulls"] = np.zeros(len(columns["dates"]), dtype='uint32')
+        for bit, kwd in enumerate(self.null_fields):
+            if kwd not in table.column_names:
+                continue
+            column = table.column(kwd)
+            if column.null_count:
+                columns["nulls"] |= column.is_null().to_numpy(zero_copy_only=False).astype('uint32') << np.uint32(bit)
+                column = column.fill_null(0)
+            columns[kwd] = column.to_numpy().astype(self.dtypes[kwd], copy=False)
+        return self.splitStates(codes, names, columns)
+
+    def getNullMask(self, nulls, kwd):
+        # Rows of a `nulls` column whose `kwd` value was null, or None if there are none
+        if kwd not in self.null_fields:
+            return None
+        mask = (nulls & (np.uint32(1) << np.uint32(self.null_fields.index(kwd)))) != 0
+        return mask if mask.any() else None
+
+    def getPixelWidth(self):
+        # Approximate width of the axes in pixels
+        params = mpl.rcParams
+        return int(self.length * params["figure.dpi"] *
+                   (params["figure.subplot.right"] - params["figure.subplot.left"]))
+
+    def getLevelOfDetail(self):
+        """
+        Chooses the plotted bins from `self.bin_size`. `auto` keeps daily bars
+        while they fit the axes' pixel width, then tries weekly and monthly
+        bins, then falls back to peak-preserving decimation. Sets
+        self.bin_starts (None for daily bars) and self.bin_label.
+        """
+        dates = self.data["dates"]["data"]
+        n = len(dates)
+        size = self.bin_size
+        if size == 'auto':
+            width = self.getPixelWidth()
+            size = 'none'
+            if n > width:
+                weeks = len(np.unique(self.getBinKeys(dates, 'week')))
+                months = len(np.unique(self.getBinKeys(dates, 'month')))
+                size = 'week' if weeks <= width else 'month' if months <= width else 'peaks'
+        self.bin_starts, self.bin_label = None, None
+        if size in ['none', 'day', 1] or n == 0:
+            return
+        if size == 'peaks':
+            step = -(-n // self.getPixelWidth())
+            self.bin_starts = np.arange(0, n, step)
+            self.bin_label = f"peak of every {step} days"
+            return
+        keys = self.getBinKeys(dates, size)
+        self.bin_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.bin_label = {'week': 'weekly', 'month': 'monthly'}.get(size, f"{size}-day bins")
+
+    def getBinKeys(self, dates, size):
+        # One key per date; equal keys share a bin. Weeks start on Monday.
+        if size == 'week':
+            return (dates - np.datetime64('1969-12-29')).astype('int64') // 7
+        if size == 'month':
+            return dates.astype('datetime64[M]')
+        return np.arange(len(dates)) // size
+
+    def downsample(self, data):
+        """
+        Combines a series into the bins chosen by getLevelOfDetail() with
+        np.*.reduceat: sums for increases, means for averages and rates,
+        the last value for cumulative totals, or the largest-magnitude value
+        of each bin when decimating
+        """
+        values = data["data"]
+        starts = self.bin_starts
+        if starts is None:
+            return values
+        values = values.astype('float64')
+        if self.bin_label.startswith('peak'):
+            values = np.nan_to_num(values)
+            highs = np.maximum.reduceat(values, starts)
+            lows = np.minimum.reduceat(values, starts)
+            return np.where(-lows > highs, lows, highs)
+        if data["bin"] == 'last':
+            return values[np.r_[starts[1:], len(values)] - 1]
+        valid = np.isfinite(values)
+        sums = np.add.reduceat(np.where(valid, values, 0), starts)
+        if data["bin"] == 'sum':
+            return sums
+        counts = np.add.reduceat(valid, starts)
+        return np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
 
     def formatAxis(self): #DONE
         # Comment Line
+        self.getLevelOfDetail()
         dates = self.data["dates"]["data"]
+        if self.bin_starts is not None:
+            dates = dates[self.bin_starts]
         self.setIndexValues()
         self.x_index = []
         self.x_labels = []
         l = len(self.index_vals)
         idx = [(l*i)//(self.num_dates - 1) for i in range(self.num_dates - 1)]
         idx.append(-1)
+        # Ticks only drop the year when every shown date is in the same one
+        include_year = len(dates) > 0 and dates[0].astype('datetime64[Y]') != dates[-1].astype('datetime64[Y]')
         for i in idx:
             self.x_index.append(self.index_vals[i])
-            self.x_labels.append(dates[i])
+            self.x_labels.append(self.formatDate(dates[i], include_year))
+
+    def isEmptyRange(self):
+        # Called after applyModifier: reports a -d/--from/--to/--last selection with no rows
+        if len(self.data["dates"]["data"]):
+            return False
+        print(f"ERROR: No data for `{self.getDatasetKey()}` in the selected date range.")
+        return True
 
     def applyModifier(self): #DONE
+        """
+        Narrows every series to `--from`/`--to`/`--date` and then `--last`.
+        Bounds are found by binary search on the sorted dates and the series
+        are sliced, so the results are views.
+        """
+        dates = self.data["dates"]["data"]
+        lo, hi = 0, len(dates)
+        if self.date_from is not None:
+            lo = np.searchsorted(dates, self.date_from, side='left')
+        if self.date_to is not None:
+            hi = np.searchsorted(dates, self.date_to, side='right')
         if self.modifier is not None:
-            if self.modifier * -1 < len(self.data["dates"]["data"]):
-                for k, v in self.data.items():
-                    self.data[k]["data"] = v["data"][self.modifier:]
+            lo = max(lo, hi + self.modifier)
+        if (lo, hi) != (0, len(dates)):
+            for k, v in self.data.items():
+                self.data[k]["data"] = v["data"][lo:hi]
 
     def setIndexValues(self): #DONE
-        self.index_vals = [x for x, _ in enumerate(self.data["dates"]["data"])]
+        n = len(self.data["dates"]["data"]) if self.bin_starts is None else len(self.bin_starts)
+        self.index_vals = np.arange(n)
 
-    def addBar(self, data, label, color, bottom): #DONE
-        plt.bar(self.index_vals, data, width=self.width, label=label, color=color, bottom=bottom)
+    def getBarLayout(self, values):
+        """
+        Returns (bottoms, offsets, width) for a series x date block of bar
+        heights. Stacked bottoms come from one cumulative sum over the series
+        axis, with positive and negative values stacked away from zero.
+        """
+        n = len(values)
+        bottoms = np.zeros_like(values)
+        offsets = np.zeros(n)
+        width = self.width
+        if self.bar_mode == 'stack' and n > 1:
+            pos = np.cumsum(np.clip(values, 0, None), axis=0)
+            neg = np.cumsum(np.clip(values, None, 0), axis=0)
+            bottoms[1:] = np.where(values[1:] < 0, neg[:-1], pos[:-1])
+        elif self.bar_mode == 'group' and n > 1:
+            width = self.width / n
+            offsets = (np.arange(n) - (n - 1) / 2) * width
+        return bottoms, offsets, width
+
+    def addBar(self, data, label, color, bottom, offset=0, width=None): #DONE
+        """
+        Draws one series as a single PolyCollection (one artist rather than
+        one Rectangle per date)
+        """
+        from matplotlib.collections import PolyCollection
+        bars = PolyCollection(self.getBarVerts(data, bottom, offset, width), facecolors=color,
+                              edgecolors='none', label=label, animated=self.isBlitting())
+        plt.gca().add_collection(bars)
+        return bars
+
+    def getBarVerts(self, data, bottom, offset=0, width=None):
+        # (bars, 4 corners, xy) rectangles at self.index_vals
+        width = self.width if width is None else width
+        left = np.asarray(self.index_vals, dtype='float64') + offset - width / 2
+        verts = np.empty((len(left), 4, 2))
+        verts[:, 0, 0] = verts[:, 1, 0] = left
+        verts[:, 2, 0] = verts[:, 3, 0] = left + width
+        verts[:, 0, 1] = verts[:, 3, 1] = bottom
+        verts[:, 1, 1] = verts[:, 2, 1] = bottom + data
+        return verts
+
+    def isBlitting(self):
+        # `--watch` on screen redraws only its animated artists
+        return self.watch_interval is not None and self.output_dir is None
 
     def plotData(self): #DONE?
         # print(self.data)
+        importPlotting('Agg' if self.output_dir is not None else None)
         self.setStyle()
         self.formatAxis()
+        self.setFigsize()
+        if self.output_dir is not None:
+            return self.saveChart()
         plt.figure(figsize=self.figsize)
+        self.drawChart()
+        plt.show()
+
+    def drawChart(self):
+        self.bar_artists = {}
+        self.projection_lines = {}
+        self.resetColors()
+        plotted = []
         for kwd, data in self.data.items():
             # print(f"{kwd:<25}{data['is_plottable']}\t{data['plot']}")
             if data["is_plottable"] and data["plot"]:
@@ -795,57 +2161,1054 @@ class CovidTracker(object):
                 else:
                     self.generateRandomColor(kwd)
                     print()
-                self.addBar(data["data"], data["title"], data["color"], data["bottom"])
+                plotted.append(kwd)
+        if plotted:
+            values = np.nan_to_num(np.vstack([self.downsample(self.data[kwd]) for kwd in plotted]).astype('float64'))
+            bottoms, offsets, width = self.getBarLayout(values)
+            for kwd, heights, bottom, offset in zip(plotted, values, bottoms, offsets):
+                data = self.data[kwd]
+                self.bar_artists[kwd] = self.addBar(heights, data["title"], data["color"], bottom, offset, width)
+            plt.gca().autoscale_view()
+            self.drawProjections(plotted)
         plt.xticks(self.x_index, self.x_labels)
         plt.ylabel(self.y_axis_title)
-        plt.xlabel(self.x_axis_title)
+        plt.xlabel(self.x_axis_title if self.bin_label is None else f"{self.x_axis_title} ({self.bin_label})")
         plt.legend(loc=self.legend_location)
-        plt.title(self.chart_title)
-        plt.show()
+        plt.title(self.getChartTitle())
+
+    def drawProjections(self, plotted):
+        """
+        Draws the projections of the current dataset for the `plotted` series
+        as dashed lines past the last bar, one artist per series
+        """
+        projections = self.projections.get(self.getDatasetKey(), {})
+        kwds = [kwd for kwd in plotted if kwd in projections]
+        if not kwds or len(self.data["dates"]["data"]) == 0:
+            return
+        if self.bin_starts is not None:
+            print("Projections are only drawn on daily charts (use `--bin none`).")
+            return
+        for kwd in kwds:
+            x, values = self.getProjectionXY(projections[kwd])
+            self.projection_lines[kwd], = plt.plot(x, values, linestyle='--', color=self.data[kwd]["color"],
+                                                   label=f"{self.data[kwd]['title']} (projected)",
+                                                   animated=self.isBlitting())
+        self.addProjectionTick(projections[kwd])
+
+    def getProjectionXY(self, projection):
+        # Bar positions continue one per day past the last shown date
+        x = self.index_vals[-1] + (projection["dates"] - self.data["dates"]["data"][-1]).astype('int64')
+        return x, projection["values"]
+
+    def addProjectionTick(self, projection):
+        x = self.getProjectionXY(projection)[0][-1]
+        spacing = len(self.index_vals) / max(self.num_dates - 1, 1)
+        if self.x_index and x - self.x_index[-1] < spacing / 2:
+            # Too close to label both: the projected end replaces the last date
+            self.x_index.pop()
+            self.x_labels.pop()
+        self.x_index.append(x)
+        self.x_labels.append(self.formatDate(projection["dates"][-1]))
+
+    def saveChart(self):
+        """
+        Renders the chart into `self.output_dir` on a non-interactive backend,
+        reusing one figure for every chart. Returns (path, seconds).
+        """
+        start = time.perf_counter()
+        if plt.get_backend().lower() != 'agg':
+            plt.switch_backend('Agg')
+        if self.figure is None or not plt.fignum_exists(self.figure.number):
+            self.figure = plt.figure(figsize=self.figsize)
+        else:
+            self.figure.clf()
+            self.figure.set_size_inches(self.figsize)
+            plt.figure(self.figure.number)
+        self.drawChart()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, self.getChartName())
+        self.figure.savefig(path, format=self.output_format)
+        elapsed = time.perf_counter() - start
+        print(f"{path:<60}{elapsed:.3f}s")
+        return path, elapsed
+
+    def getChartName(self, key=None):
+        return f"{key or self.getDatasetKey()}_{self.getChartStem()}.{self.output_format}"
+
+    def getChartStem(self):
+        # Short keywords keep the name well under the file name limit with every series plotted
+        if self.chart_name is not None:
+            return self.chart_name
+        return '_'.join(data["keywords"][-1] for data in self.data.values() if data.get("plot"))
+
+    def watch(self, loaded, states, raw):
+        """
+        Shows (or saves with `-o`) the chart of the first of `states` and polls
+        `loaded` every `self.watch_interval` seconds. `raw` holds their columns
+        as loaded, before prepareStates; polls update (and `-U` saves) those,
+        then prepareStates runs again on a copy. When the data changes the
+        drawn bars and projection lines are updated in place; only they are
+        redrawn (blitted) unless new dates or larger values need new axes.
+        """
+        state = next((st for st in states if st in self.datasets), None)
+        if state is None:
+            sys.exit("ERROR: No data to watch.")
+        if not self.plot:
+            sys.exit("ERROR with `--watch`: nothing to plot (use --plot).")
+        if self.arrow_import is not None:
+            sys.exit("ERROR with `--watch`: data from `--import-arrow` cannot be polled.")
+        # Polls must reach the API rather than a cached body
+        self.cache_ttl = min(self.cache_ttl, self.watch_interval)
+        if self.cache is not None:
+            self.cache.ttl = self.cache_ttl
+
+        importPlotting('Agg' if self.output_dir is not None else None)
+        self.setStyle()
+        self.useDataset(state)
+        self.applyModifier()
+        if len(self.data["dates"]["data"]) == 0:
+            sys.exit(f"ERROR: No data for `{state}` in the selected date range.")
+        self.formatAxis()
+        self.setFigsize()
+        if self.output_dir is not None:
+            path, _ = self.saveChart()
+        else:
+            self.figure = plt.figure(figsize=self.figsize)
+            self.drawChart()
+            self.figure.canvas.mpl_connect('draw_event', self.onDraw)
+            plt.show(block=False)
+            self.figure.canvas.draw()
+        print(f"Watching `{state}` every {self.watch_interval:g}s (Ctrl-C to stop)")
+        try:
+            while self.waitWatch():
+                self.datasets.update({st: self.copyDataset(columns) for st, columns in raw.items() if columns is not None})
+                try:
+                    self.pollData(loaded)
+                except FetchError as e:
+                    print(f"ERROR: Poll failed: {e}")
+                    continue
+                fresh = {st: self.datasets.get(st) for st in loaded}
+                if all(self.datasetsEqual(raw[st], fresh[st]) for st in loaded):
+                    continue
+                raw = {st: self.copyDataset(dataset) for st, dataset in fresh.items()}
+                self.prepareStates(loaded)
+                if state not in self.datasets:
+                    continue
+                start = time.perf_counter()
+                rescale = self.refreshChart(state)
+                if self.output_dir is not None:
+                    self.figure.savefig(path, format=self.output_format)
+                    how = f"saved {path}"
+                elif rescale:
+                    self.figure.canvas.draw()
+                    how = "redrawn"
+                else:
+                    self.blitChart()
+                    how = "blitted"
+                print(f"{time.strftime('%H:%M:%S')} updated `{state}` to {self.data['dates']['data'][-1]} "
+                      f"({how} in {time.perf_counter() - start:.3f}s)")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.closeFetcher()
+
+    def waitWatch(self):
+        # Sleeps one interval (running the GUI loop on screen); False once the window is closed
+        if self.output_dir is not None:
+            time.sleep(self.watch_interval)
+            return True
+        if not plt.fignum_exists(self.figure.number):
+            return False
+        self.figure.canvas.start_event_loop(self.watch_interval)
+        return plt.fignum_exists(self.figure.number)
+
+    def copyDataset(self, dataset):
+        return None if dataset is None else {kwd: column.copy() for kwd, column in dataset.items()}
+
+    def datasetsEqual(self, a, b):
+        if a is None or b is None:
+            return a is b
+        return a.keys() == b.keys() and all(np.array_equal(a[k], b[k], equal_nan=a[k].dtype.kind in 'fcmM')
+                                            for k in a)
+
+    def refreshChart(self, state):
+        """
+        Moves the drawn artists to the current data of `state`: bars get new
+        vertices and projection lines new data. Returns True when the axes had
+        to be rescaled or relabelled (the caller redraws everything), False
+        when blitting the artists is enough.
+        """
+        ax = self.figure.gca()
+        ticks = (self.x_index, self.x_labels, self.bin_label)
+        self.useDataset(state)
+        self.applyModifier()
+        self.formatAxis()
+        points = []
+        kwds = list(self.bar_artists)
+        if kwds:
+            values = np.nan_to_num(np.vstack([self.downsample(self.data[kwd]) for kwd in kwds]).astype('float64'))
+            bottoms, offsets, width = self.getBarLayout(values)
+            for kwd, heights, bottom, offset in zip(kwds, values, bottoms, offsets):
+                verts = self.getBarVerts(heights, bottom, offset, width)
+                self.bar_artists[kwd].set_verts(verts)
+                points.append(verts.reshape(-1, 2))
+        projections = self.projections.get(self.getDatasetKey(), {})
+        projection = None
+        for kwd, line in self.projection_lines.items():
+            if kwd in projections and self.bin_starts is None and len(self.index_vals):
+                projection = projections[kwd]
+                x, values = self.getProjectionXY(projection)
+                line.set_data(x, values)
+                points.append(np.column_stack([x, values])[np.isfinite(values)])
+            line.set_visible(projection is not None)
+        if projection is not None:
+            self.addProjectionTick(projection)
+        points = np.vstack(points) if points else np.empty((0, 2))
+
+        rescale = (self.x_index, self.x_labels, self.bin_label) != ticks
+        if len(points):
+            (x0, x1), (y0, y1) = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+            rescale = rescale or points[:, 0].min() < x0 or points[:, 0].max() > x1 \
+                or points[:, 1].min() < y0 or points[:, 1].max() > y1
+        if rescale:
+            ax.ignore_existing_data_limits = True
+            ax.update_datalim(points)
+            ax.autoscale_view()
+            ax.set_xticks(self.x_index, self.x_labels)
+            ax.set_xlabel(self.x_axis_title if self.bin_label is None else f"{self.x_axis_title} ({self.bin_label})")
+        return rescale
+
+    def onDraw(self, event):
+        # A full draw skips the animated artists: keep it as the blit background, then add them
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self.drawAnimated()
+
+    def drawAnimated(self):
+        ax = self.figure.gca()
+        for artist in list(self.bar_artists.values()) + list(self.projection_lines.values()):
+            ax.draw_artist(artist)
+
+    def blitChart(self):
+        canvas = self.figure.canvas
+        canvas.restore_region(self.background)
+        self.drawAnimated()
+        canvas.blit(self.figure.gca().bbox)
+        canvas.flush_events()
+
+    def resetSelection(self):
+        # Clears plot/print flags and marks every color unused
+        for data in self.data.values():
+            data["plot"] = False
+            data["print"] = False
+        self.resetColors()
+
+    def resetColors(self):
+        # Colors are only taken within one chart
+        for color, data in self.colors.items():
+            data["is_used"] = color == "invalid_color"
 
-    def printData(self): # NOT FUNCTIONAL
+    def renderBatch(self, states):
+        """
+        Renders every (state x metric set) chart across a process pool. Each
+        worker keeps one tracker and one figure for all of its charts.
+        """
+        if self.chart_name is not None and len(self.batch_sets) > 1:
+            sys.exit("ERROR: `--name` would give every `--batch` set the same file name.")
+        jobs = [(st, opts) for st in states if st in self.datasets for opts in self.batch_sets]
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        start = time.perf_counter()
+        results = []
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=initBatchWorker,
+                                 initargs=(self.cli_args,)) as pool:
+            futures = [pool.submit(renderBatchChart, st, self.datasets[st], opts) for st, opts in jobs]
+            for future in as_completed(futures):
+                if future.result() is not None:
+                    results.append(future.result())
+        total = time.perf_counter() - start
+        render = sum(elapsed for _, elapsed in results)
+        print(f"Rendered {len(results)} charts in {total:.3f}s ({render:.3f}s of render time)")
+        return results
+
+    def getPrintSpec(self, values):
+        """
+        Returns (printf conversion, widest formatted value) for a column
+        """
+        if values.dtype.kind == 'M':
+            return '%s', 10
+        conv = '%.2f' if values.dtype.kind == 'f' else '%d'
+        if len(values) == 0:
+            return conv, 0
+        finite = values[np.isfinite(values)] if values.dtype.kind == 'f' else values
+        extremes = [finite.min(), finite.max()] if len(finite) else []
+        return conv, max([len(conv % v) for v in extremes] + [3]) # 3 fits `nan`
+
+    def printData(self): #DONE
+        """
+        Writes the dates and every selected `print` series (all of them with
+        `--printall`) as an aligned table or CSV/TSV. Rows are formatted by one
+        printf-style template per row (as np.savetxt does) and written at once.
+        """
+        kwds = [kwd for kwd, data in self.data.items()
+                if kwd != "dates" and data["is_printable"] and (data["print"] or self.print_all)]
+        columns = [self.data["dates"]["data"]] + [self.data[kwd]["data"] for kwd in kwds]
+        specs = [self.getPrintSpec(column) for column in columns]
+        values = [np.datetime_as_string(columns[0]).tolist()] + [c.tolist() for c in columns[1:]]
+        state = self.getDatasetKey()
+
+        if self.print_format == 'table':
+            headers = ["Date"] + [self.data[kwd]["title"] for kwd in kwds]
+            widths = [max(len(h), w) for h, (_, w) in zip(headers, specs)]
+            template = "  ".join(conv.replace('%', f"%{w}") for (conv, _), w in zip(specs, widths))
+            lines = [state.upper(), "  ".join(h.rjust(w) for h, w in zip(headers, widths))]
+            text = "\n".join(lines) + "\n"
+            end = "\n\n"
+        else:
+            sep = ',' if self.print_format == 'csv' else '\t'
+            template = sep.join([state.replace('%', '%%')] + [conv for conv, _ in specs])
+            text = "" if self.print_started else sep.join(["state", "date"] + kwds) + "\n"
+            end = "\n"
+        if len(values[0]):
+            text += "\n".join(map(template.__mod__, zip(*values))) + end
+
+        if self.print_output is None:
+            (self.print_stream or sys.stdout).write(text)
+        else:
+            with open(self.print_output, 'a' if self.print_started else 'w') as f:
+                f.write(text)
+        self.print_started = True
 
-        for kwd, data in self.data.items():
-            if data["is_printable"] and data["print"]:
-                # Print Data
-                # print(f"{data["title"]}: {data[""]}")
-                pass
+    def loadData(self):
+        """
+        Fills self.datasets from a snapshot or the API according to the CLI
+        options and returns the dataset keys to output
+        """
+        stage = self.profiler.stage
+        if self.incremental:
+            if os.path.exists(self.snapshot_load):
+                with stage("loadSnapshot"):
+                    self.loadSnapshot(self.snapshot_load)
+            states = self.fetch_states or [self.getDatasetKey()]
+            with stage("updateDatasets"):
+                self.updateDatasets(states)
+        elif self.snapshot_load is not None:
+            with stage("loadSnapshot"):
+                self.loadSnapshot(self.snapshot_load)
+            states = self.fetch_states or [self.getDatasetKey()]
+        elif self.arrow_import is not None:
+            with stage("importArrow"):
+                self.importArrow(self.arrow_import)
+            states = self.fetch_states or [self.getDatasetKey()]
+        elif self.fetch_states is not None:
+            if self.data_type == 'national':
+                sys.exit("ERROR: `--states` cannot be used with national data.")
+            with stage("fetchBulk" if self.bulk else "fetchStates"):
+                self.fetchStates(self.fetch_states)
+            states = self.fetch_states
+        elif self.stream:
+            self.generateUrl()
+            fetching = stage("fetchStream")
+            with stage("parseStream", exclude=fetching):
+                self.parseStream(self.iterRecords(fetching.iterate(self.fetchStream(self.url))))
+            states = [self.getDatasetKey()]
+        else:
+            with stage("generateUrl"):
+                self.generateUrl()
+            with stage("makeRequest"):
+                json_data = self.makeRequest()
+            with stage("parse"):
+                self.parse(json_data)
+            states = [self.getDatasetKey()]
+        if self.snapshot_save is not None:
+            with stage("saveSnapshot"):
+                self.saveSnapshot(self.snapshot_save)
+        if self.arrow_export is not None:
+            with stage("exportArrow"):
+                self.exportArrow(self.arrow_export)
+        return states
 
     def run(self):
-        self.generateUrl()
-        json_data = self.makeRequest()
-        self.parse(json_data)
-        self.applyModifier()
+        if self.jobs_file is not None:
+            self.runJobs(self.jobs_file)
+            return
+        if self.serve_port is not None:
+            self.serve()
+            return
+        if self.print and self.print_format != 'table' and self.print_output is None:
+            # CSV/TSV owns stdout, so diagnostics and reports go to stderr to keep it parseable
+            import contextlib
+            self.print_stream = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                self.runStates()
+        else:
+            self.runStates()
+
+    def runStates(self):
+        self.resolveStates()
+        try:
+            states = self.loadData()
+        except FetchError as e:
+            sys.exit(f"ERROR: {e}")
+        finally:
+            self.closeFetcher()
+        self.process(states)
+
+    def resolveStates(self):
+        # Works out the states to fetch when `--rank`/`--region`/`--bulk` imply them
+        if self.fetch_states is None and self.data_type == 'state' and self.snapshot_load is None \
+                and self.arrow_import is None:
+            if self.rank_metric is not None:
+                self.fetch_states = list(self.states)
+            elif self.rollups is not None:
+                self.fetch_states = [st for region in self.rollups for st in self.census_regions[region]]
+            elif self.bulk:
+                self.fetch_states = [self.state]
+
+    def process(self, states):
+        """
+        Validates, ranks, aggregates, projects and outputs the loaded `states`
+        """
+        loaded = states
+        # --watch polls into the upstream columns, not the validated/aggregated ones
+        raw = {st: self.copyDataset(self.datasets.get(st)) for st in loaded} if self.watch_interval is not None else None
+        states = self.prepareStates(states)
+        if self.watch_interval is not None:
+            self.watch(loaded, states, raw)
+        elif self.batch_sets is not None:
+            with self.profiler.stage("renderBatch"):
+                self.renderBatch(states)
+        else:
+            for state in states:
+                if state not in self.datasets:
+                    print(f"ERROR: No data for `{state}`.")
+                    continue
+                with self.profiler.stage("useDataset"):
+                    self.useDataset(state)
+                self.output()
+        if self.profile_report is not None:
+            self.writeProfileReport(self.profile_report)
+
+    def prepareStates(self, states):
+        # Validates, ranks, aggregates and projects `states`; returns the keys to output
+        stage = self.profiler.stage
+        if self.validate is not None:
+            with stage("validateStates"):
+                self.validateStates(states)
+        if self.rank_metric is not None:
+            with stage("rankStates"):
+                self.rankStates(states)
+        with stage("aggregateStates"):
+            states = self.aggregateStates(states)
+        if self.project_metrics is not None:
+            with stage("projectStates"):
+                self.projectStates(states)
+        return states
+
+    def loadJobs(self, path):
+        """
+        Reads a job file (.json, .toml, .yaml/.yml). It holds a list of jobs,
+        or a table with `jobs` and optional `defaults`. Each job, and
+        `defaults`, is a list of CLI arguments or one string of them.
+        Returns the full argument list of every job.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        try:
+            with open(path, 'rb') as f:
+                if ext == '.json':
+                    spec = json.load(f)
+                elif ext == '.toml':
+                    try:
+                        import tomllib
+                    except ImportError:
+                        try:
+                            import tomli as tomllib
+                        except ImportError:
+                            sys.exit("ERROR: TOML job files require Python 3.11+ or tomli (`pip install tomli`).")
+                    spec = tomllib.load(f)
+                elif ext in ['.yaml', '.yml']:
+                    try:
+                        import yaml
+                    except ImportError:
+                        sys.exit("ERROR: YAML job files require PyYAML (`pip install pyyaml`).")
+                    spec = yaml.safe_load(f)
+                else:
+                    sys.exit(f"ERROR: `{path}` is not a .json, .toml, .yaml or .yml job file.")
+        except OSError as e:
+            sys.exit(f"ERROR: Could not read `{path}`: {e}")
+        except ValueError as e:
+            sys.exit(f"ERROR: Could not parse `{path}`: {e}")
+        if isinstance(spec, list):
+            spec = {"jobs": spec}
+        if not isinstance(spec, dict) or not isinstance(spec.get("jobs"), list):
+            sys.exit(f"ERROR: `{path}` needs a list of jobs.")
+
+        import shlex
+        def toArgs(entry):
+            if isinstance(entry, str):
+                return shlex.split(entry)
+            if isinstance(entry, list):
+                return [str(arg) for arg in entry]
+            sys.exit(f"ERROR: `{path}`: {entry!r} is not a list or string of arguments.")
+
+        # The command line (minus `--jobs`) applies to every job, then `defaults`
+        base = []
+        for i, arg in enumerate(self.cli_args[1:], 1):
+            if arg in ['-J', '--jobs'] or (i > 1 and self.cli_args[i-1] in ['-J', '--jobs']):
+                continue
+            base.append(arg)
+        defaults = toArgs(spec.get("defaults", []))
+        return [[self.cli_args[0]] + base + defaults + toArgs(job) for job in spec["jobs"]]
+
+    def runJobs(self, path):
+        """
+        Runs every job in a job file in this process. The unique URLs the jobs
+        need are fetched and parsed once, with this run's fetch settings.
+        Then each job runs against the shared datasets. Jobs that only print
+        or save charts run in a process pool. Jobs that show windows, write
+        --print-output files, --batch or load their own data run here in order.
+        Output is printed in job order.
+        """
+        jobs = []
+        for n, args in enumerate(self.loadJobs(path), 1):
+            try:
+                job = CovidTracker(cli_args=args)
+            except SystemExit as e:
+                print(f"Job {n}: {e}")
+                continue
+            if job.serve_port is not None or job.jobs_file is not None:
+                print(f"ERROR in job {n}: `--serve` and `--jobs` cannot be used in a job.")
+                continue
+            job.resolveStates()
+            own_data = job.snapshot_load is not None or job.arrow_import is not None or job.incremental
+            keys = job.fetch_states or [job.getDatasetKey()]
+            urls = {} if own_data else {key: job.generateStateUrl(key) for key in keys}
+            jobs.append((n, job, keys, urls, own_data))
+        self.renameClashingJobs(jobs)
+
+        unique = {url for *_, urls, _ in jobs for url in urls.values()}
+        stage = self.profiler.stage
+        with stage("fetchUrls"):
+            shared = self.fetchUrls({url: url for url in unique})
+        self.closeFetcher()
+        print(f"Fetched {len(shared)} of {len(unique)} unique URL(s) for {len(jobs)} job(s)")
+
+        def parallel(job, own_data):
+            return not own_data and job.batch_sets is None and job.print_output is None \
+                and (job.output_dir is not None or not job.plot)
+        from concurrent.futures import ProcessPoolExecutor
+        with stage("runJobs"), ProcessPoolExecutor(max_workers=self.processes, initializer=initJobWorker,
+                                                   initargs=(shared,)) as pool:
+            futures = {n: pool.submit(runJob, job.cli_args, urls)
+                       for n, job, keys, urls, own_data in jobs if parallel(job, own_data)}
+            for n, job, keys, urls, own_data in jobs:
+                if n in futures:
+                    output, error = futures[n].result()
+                    print(output, end='')
+                    if error is not None:
+                        print(f"Job {n}: {error}")
+                    continue
+                try:
+                    if own_data:
+                        job.run()
+                    else:
+                        job.datasets.update({key: shared[url] for key, url in urls.items() if url in shared})
+                        job.process(keys)
+                except SystemExit as e:
+                    print(f"Job {n}: {e}")
+        if self.profile_report is not None:
+            self.writeProfileReport(self.profile_report)
+
+    def renameClashingJobs(self, jobs):
+        """
+        Jobs that would save the same chart file (e.g. ones that only differ
+        in -l or -xy) run at the same time. Every job after the first that
+        claims a path without its own `--name` gets `_job<n>` appended.
+        """
+        claimed = {}
+        for n, job, keys, *_ in jobs:
+            if job.output_dir is None or not job.plot or job.batch_sets is not None:
+                continue
+            paths = [os.path.join(job.output_dir, job.getChartName(key)) for key in keys]
+            clash = next((claimed[p] for p in paths if p in claimed), None)
+            if clash is not None and job.chart_name is None:
+                job.chart_name = f"{job.getChartStem()}_job{n}"
+                job.cli_args = job.cli_args + ['--name', job.chart_name]
+                print(f"Job {n}: saves the same chart as job {clash}, saving it as `{job.getChartName(keys[0])}`.")
+                paths = [os.path.join(job.output_dir, job.getChartName(key)) for key in keys]
+            elif clash is not None:
+                print(f"Job {n}: `--name` {job.chart_name} saves the same chart as job {clash}.")
+            for p in paths:
+                claimed.setdefault(p, n)
+
+    def writeProfileReport(self, path):
+        report = self.profiler.report()
+        report["command"] = self.cli_args
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def buildMatrix(self, states, metrics):
+        """
+        Aligns `states` on the union of their dates into a dense
+        state x date x metric block. Dates a state has no row for are NaN.
+        """
+        states = [st for st in states if st in self.datasets]
+        if not states:
+            return states, np.array([], dtype='datetime64[D]'), np.empty((0, 0, len(metrics)))
+        dates = np.unique(np.concatenate([self.datasets[st]["dates"] for st in states]))
+        block = np.full((len(states), len(dates), len(metrics)), np.nan)
+        for i, state in enumerate(states):
+            self.useDataset(state)
+            pos = np.searchsorted(dates, self.data["dates"]["data"])
+            block[i, pos, :] = np.column_stack([self.data[kwd]["data"] for kwd in metrics])
+        return states, dates, block
+
+    def aggregateStates(self, states):
+        """
+        Sums the parsed columns of `states` into one dataset per group
+        (`--sum-states` and/or `--region`) with a single membership x block
+        product. Returns the keys to output: the groups if any, else `states`.
+        """
+        groups = {}
+        if self.rollups is not None:
+            for region in self.rollups:
+                groups[region] = self.census_regions[region]
+        if self.sum_states:
+            groups['sum'] = list(states)
+        if not groups:
+            return states
+
+        metrics = [kwd for kwd, info in self.data.items() if "api_field" in info and kwd != "dates"]
+        members, dates, block = self.buildMatrix(sorted(set(st for g in groups.values() for st in g)), metrics)
+        membership = np.array([[st in groups[g] for st in members] for g in groups], dtype='float64')
+        sums = np.tensordot(membership, np.nan_to_num(block), axes=1)
+        for g, name in enumerate(groups):
+            columns = {"dates": dates.copy()}
+            for m, kwd in enumerate(metrics):
+                columns[kwd] = sums[g, :, m].astype(self.dtypes[kwd])
+            self.datasets[name] = columns
+            self.populations[name] = sum(self.populations.get(st, 0) for st in members if st in groups[name])
+        return list(groups)
+
+    def rankStates(self, states):
+        """
+        Prints the top `self.rank_top` states by the mean of `self.rank_metric`
+        over the last `self.rank_window` dates, using argpartition
+        """
+        kwd = self.keyword_index.get(self.rank_metric)
+        if kwd is None:
+            sys.exit(f"ERROR with `--rank`: {self.rank_metric} is not a valid option.")
+        states, dates, block = self.buildMatrix(states, [kwd])
+        if not states:
+            print("ERROR: No data to rank.")
+            return []
+        window = block[:, -self.rank_window:, 0]
+        counts = (~np.isnan(window)).sum(axis=1)
+        values = np.where(counts > 0, np.nansum(window, axis=1) / np.maximum(counts, 1), -np.inf)
+        k = min(self.rank_top, int((counts > 0).sum()))
+        if k == 0:
+            print("ERROR: No state has data for the ranking window.")
+            return []
+        top = np.argpartition(-values, k - 1)[:k]
+        top = top[np.argsort(-values[top], kind='stable')]
+
+        title = self.data[kwd]["title"]
+        print(f"Top {k} states by {title} (mean of last {self.rank_window} day(s) ending {dates[-1]})")
+        ranking = []
+        for rank, i in enumerate(top, 1):
+            print(f"{rank:>4}  {states[i]:<4}{values[i]:>16.2f}")
+            ranking.append((states[i], float(values[i])))
+        return ranking
+
+    def fitLogLinear(self, values):
+        """
+        Least-squares fit of log(value) = a + b * day for every row of
+        `values` (... x days) at once, as one batched solve of the 2x2 normal
+        equations. Non-positive and NaN values are skipped. Returns (a, b),
+        NaN where a row has fewer than two usable days.
+        """
+        x = np.arange(values.shape[-1], dtype='float64')
+        w = values > 0
+        y = np.log(np.where(w, values, 1))
+        sw, sx, sxx = w.sum(-1), (w * x).sum(-1), (w * x * x).sum(-1)
+        sy, sxy = (w * y).sum(-1), (w * x * y).sum(-1)
+        normal = np.stack([np.stack([sw, sx], -1), np.stack([sx, sxx], -1)], -2).astype('float64')
+        rhs = np.stack([sy, sxy], -1)
+        ok = sw >= 2
+        normal[~ok] = np.eye(2)
+        coef = np.linalg.solve(normal, rhs[..., None])[..., 0]
+        coef[~ok] = np.nan
+        return coef[..., 0], coef[..., 1]
+
+    def projectStates(self, states, report=True):
+        """
+        Fits log-linear growth to the last `self.project_window` days of every
+        `self.project_metrics` series for all `states` in one batched fit and
+        extrapolates `self.project_days` days into self.projections. Prints
+        the daily growth, doubling time and final projected value.
+        """
+        kwds = []
+        for opt in self.project_metrics:
+            kwd = self.keyword_index.get(opt)
+            if kwd is None:
+                sys.exit(f"ERROR with `--project`: {opt} is not a valid option.")
+            kwds.append(kwd)
+        states, dates, block = self.buildMatrix(states, kwds)
+        if not states:
+            print("ERROR: No data to project.")
+            return {}
+        end = len(dates) if self.date_to is None else int(np.searchsorted(dates, self.date_to, side='right'))
+        if end == 0:
+            print("ERROR: No dates to project from.")
+            return {}
+        window = block[:, max(0, end - self.project_window):end]
+        a, b = self.fitLogLinear(np.moveaxis(window, 1, -1)) # state x metric
+        steps = np.arange(window.shape[1], window.shape[1] + self.project_days)
+        values = np.exp(a[..., None] + b[..., None] * steps)
+        future = dates[end - 1] + np.arange(1, self.project_days + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            doubling = np.where(np.abs(b) > 1e-9, np.log(2) / b, np.inf) # inf: flat
+        for i, state in enumerate(states):
+            self.projections[state] = {kwd: {"dates": future, "values": values[i, j], "growth": b[i, j],
+                                             "doubling": doubling[i, j]} for j, kwd in enumerate(kwds)}
+        if report:
+            print(f"Projections from the last {window.shape[1]} day(s) ending {dates[end - 1]} "
+                  f"(log-linear fit, negative doubling = halving time)")
+            print(f"{'state':<8}{'series':<32}{'growth/day':>12}{'doubling':>12}{'in ' + str(self.project_days) + ' days':>14}")
+            for i, state in enumerate(states):
+                for j, kwd in enumerate(kwds):
+                    growth = (np.exp(b[i, j]) - 1) * 100
+                    final = values[i, j, -1] if self.project_days else np.nan
+                    print(f"{state:<8}{self.data[kwd]['title']:<32}{growth:>+11.2f}%{doubling[i, j]:>12.1f}{final:>14.1f}")
+        return self.projections
+
+    def validateStates(self, states):
+        """
+        Checks the parsed series of `states` in one state x date x series
+        block: `cumulative` series that decrease, increases that differ from
+        the day-over-day difference of their total, null fields, and spikes in
+        increases (more than `self.spike_factor` standard deviations above the
+        trailing `self.spike_window`-day mean). Prints one row per check and
+        series, then masks or repairs the flagged values if `self.validate`
+        asks for it. Returns {check: state x date x series flags}.
+        """
+        kwds = self.null_fields
+        states, dates, block = self.buildMatrix(states, kwds)
+        if not states:
+            print("ERROR: No data to validate.")
+            return {}
+        col = {kwd: j for j, kwd in enumerate(kwds)}
+        positions = [np.searchsorted(dates, self.datasets[st]["dates"]) for st in states]
+        nulls = np.zeros(block.shape, dtype=bool)
+        bits = np.uint32(1) << np.arange(len(kwds), dtype='uint32')
+        for i, state in enumerate(states):
+            if "nulls" in self.datasets[state]:
+                nulls[i, positions[i]] = (self.datasets[state]["nulls"][:, None] & bits) != 0
+        values = np.where(nulls, np.nan, block)
+        step = np.full(block.shape, np.nan)
+        step[:, 1:] = np.diff(values, axis=1)
+
+        flags = {check: np.zeros(block.shape, dtype=bool) for check in ["decrease", "increase != diff", "spike"]}
+        flags["null"] = nulls
+        totals = [col[kwd] for kwd in kwds if self.data[kwd].get("cumulative")]
+        flags["decrease"][..., totals] = step[..., totals] < 0
+        increases = [col[kwd] for kwd in kwds if "increase_of" in self.data[kwd]]
+        of = [col[self.data[kwd]["increase_of"]] for kwd in kwds if "increase_of" in self.data[kwd]]
+        flags["increase != diff"][..., increases] = np.abs(values[..., increases] - step[..., of]) > 0.5
+
+        # Trailing window statistics from cumulative sums over the date axis
+        window = self.spike_window
+        x = values[..., increases]
+        valid = ~np.isnan(x)
+        x0 = np.where(valid, x, 0)
+        sums, squares, counts = [np.concatenate([np.zeros_like(a[:, :1]), np.cumsum(a, axis=1)], axis=1)
+                                 for a in (x0, x0 ** 2, valid.astype('float64'))]
+        n = len(dates)
+        if n > window:
+            full = (counts[:, window:n] - counts[:, :n - window]) == window
+            mean = (sums[:, window:n] - sums[:, :n - window]) / window
+            var = (squares[:, window:n] - squares[:, :n - window]) / window - mean ** 2
+            std = np.sqrt(np.clip(var, 0, None))
+            spikes = full & valid[:, window:] & (x[:, window:] - mean > self.spike_factor * np.maximum(std, 1))
+            flags["spike"][:, window:, increases] = spikes
+
+        self.printValidation(states, dates, kwds, flags)
+        if self.validate == 'mask':
+            bad = np.logical_or.reduce(list(flags.values()))
+            self.writeValidated(states, positions, kwds, np.where(bad, np.nan, values), bad.any(axis=1))
+        elif self.validate == 'repair':
+            # Nulls and decreases in totals take the running maximum, and
+            # increases are recomputed as the day-over-day difference of the
+            # repaired totals wherever they are null or disagree with it.
+            # Spikes are left alone: they are often real (backlogs) and are
+            # only reported or masked.
+            fixed = values.copy()
+            fixed[..., totals] = np.fmax.accumulate(values[..., totals], axis=1)
+            fixed_step = np.full(block.shape[:2] + (len(of),), np.nan)
+            fixed_step[:, 1:] = np.diff(fixed[..., of], axis=1)
+            current = values[..., increases]
+            repair = ~np.isnan(fixed_step) & (np.isnan(current) | (np.abs(current - fixed_step) > 0.5))
+            fixed[..., increases] = np.where(repair, fixed_step, current)
+            changed = ~((fixed == values) | (np.isnan(fixed) & np.isnan(values)))
+            self.writeValidated(states, positions, kwds, np.nan_to_num(fixed), changed.any(axis=1),
+                                nulls & np.isnan(fixed))
+        return flags
+
+    def printValidation(self, states, dates, kwds, flags):
+        print(f"Data quality: {len(states)} state(s), {len(dates)} dates, {len(kwds)} series")
+        rows = []
+        for check, mask in flags.items():
+            per_series = mask.sum(axis=(0, 1))
+            for j in np.flatnonzero(per_series):
+                st_idx, date_idx = np.nonzero(mask[:, :, j])
+                first = np.argmin(date_idx)
+                rows.append(f"{check:<18}{kwds[j]:<22}{per_series[j]:>8}{mask[:, :, j].any(axis=1).sum():>8}"
+                            f"  {states[st_idx[first]]} {dates[date_idx[first]]}")
+        if not rows:
+            print("No problems found.")
+            return
+        print(f"{'check':<18}{'series':<22}{'count':>8}{'states':>8}  first")
+        print("\n".join(rows))
+
+    def writeValidated(self, states, positions, kwds, block, changed, nulls=None):
+        # Copies the series flagged in `changed` (state x series) back into
+        # self.datasets; masked series become float64 so they can hold NaN.
+        # `nulls` (state x date x series) replaces the null bits after a repair.
+        bits = np.uint32(1) << np.arange(len(kwds), dtype='uint32')
+        for i, state in enumerate(states):
+            columns = dict(self.datasets[state])
+            if nulls is not None and "nulls" in columns:
+                columns["nulls"] = np.bitwise_or.reduce(np.where(nulls[i, positions[i]], bits, np.uint32(0)), axis=1)
+            for j in np.flatnonzero(changed[i]):
+                values = block[i, positions[i], j]
+                if not np.isnan(values).any():
+                    values = values.astype(self.dtypes[kwds[j]])
+                columns[kwds[j]] = values
+            self.datasets[state] = columns
+
+    def publishData(self, states):
+        """
+        Builds every series (derived ones included) for `states` and swaps them
+        in for the server in one assignment, so requests never see a partial refresh
+        """
+        served = {}
+        for state in states:
+            if state in self.datasets:
+                self.useDataset(state)
+                served[state] = {kwd: info["data"] for kwd, info in self.data.items()}
+        self.served = served
+
+    def pollData(self, states):
+        # Fetches fresh data for `states` the way this run loaded it
+        if self.incremental or self.snapshot_load is not None:
+            self.updateDatasets(states)
+            if self.snapshot_save is not None:
+                self.saveSnapshot(self.snapshot_save, [st for st in states if st in self.datasets])
+        else:
+            self.fetchStates(states)
+
+    def refreshData(self, states):
+        self.pollData(states)
+        self.publishData(states)
+
+    def refreshLoop(self, states):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refreshData(states)
+            except Exception as e:
+                print(f"ERROR: Refresh failed: {e}")
+
+    def serve(self):
+        """
+        Answers JSON queries from the in-memory datasets, e.g.
+        /states, /metrics, /states/ut and /states/ut/new_cases?last=30.
+        Data is refreshed by a background thread every `self.refresh_interval`.
+        """
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        from urllib.parse import urlparse, parse_qs
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split('/') if p]
+                query = parse_qs(url.query)
+                status, body = tracker.answerQuery(parts, query)
+                body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # Refreshes must reach the API rather than a cached body
+        self.cache_ttl = min(self.cache_ttl, self.refresh_interval)
+        if self.cache is not None:
+            self.cache.ttl = self.cache_ttl
+        try:
+            states = self.loadData()
+        except FetchError as e:
+            self.closeFetcher()
+            sys.exit(f"ERROR: {e}")
+        self.publishData(states)
+        refresher = threading.Thread(target=self.refreshLoop, args=(states,), daemon=True)
+        refresher.start()
+        server = ThreadingHTTPServer((self.serve_host, self.serve_port), Handler)
+        server.daemon_threads = True
+        self.server = server
+        print(f"Serving {len(self.served)} dataset(s) on http://{self.serve_host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.closeFetcher()
+
+    def answerQuery(self, parts, query):
+        """
+        Returns (status, JSON body) for a path split into `parts`
+        """
+        served = self.served
+        if parts == ['metrics']:
+            return 200, {m["key"]: {"short": m["short"], "title": m["title"]} for m in METRICS}
+        if not parts or parts[0] != 'states':
+            return 404, {"error": "Unknown path. Try /states or /metrics"}
+        if len(parts) == 1:
+            return 200, {"states": list(served)}
+        state = parts[1].lower()
+        if state not in served:
+            return 404, {"error": f"No data for `{state}`"}
+        series = served[state]
+        dates = series["dates"]
+        if len(parts) == 2:
+            return 200, {
+                "state": state,
+                "length": len(dates),
+                "first": str(dates[0]) if len(dates) else None,
+                "last": str(dates[-1]) if len(dates) else None,
+                "metrics": [kwd for kwd in series if kwd != "dates"]
+            }
+        kwd = self.keyword_index.get(parts[2])
+        if kwd is None:
+            return 404, {"error": f"`{parts[2]}` is not a valid metric"}
+        values = series[kwd]
+        if "last" in query:
+            try:
+                last = int(query["last"][0])
+            except ValueError:
+                return 400, {"error": "`last` must be an integer"}
+            dates = dates[-last:] if last > 0 else dates[:0]
+            values = values[-last:] if last > 0 else values[:0]
+        return 200, {
+            "state": state,
+            "metric": kwd,
+            "dates": np.datetime_as_string(dates).tolist(),
+            "values": values.tolist()
+        }
+
+    def output(self):
+        stage = self.profiler.stage
+        with stage("applyModifier"):
+            self.applyModifier()
+        if self.isEmptyRange():
+            return
         if self.plot:
-            self.plotData()
+            with stage("plotData"):
+                self.plotData()
         if self.print:
-            self.printData()
+            with stage("printData"):
+                self.printData()
 
     def exportData(self): #DONE
         sys.exit(f"""Printing Default Variables for CovidTracker
 
 base_url -- '{self.base_url}'
 url -- '{self.url}'
+use_cache -- '{self.use_cache}'
+offline -- '{self.offline}'
+cache_dir -- '{self.cache_dir}'
+cache_ttl -- '{self.cache_ttl}'
+cache_size -- '{self.cache_size}'
 delim -- '{self.delim}'
 date -- '{self.date}'
 data_type -- '{self.data_type}'
 state -- '{self.state}'
+fetch_states -- '{self.fetch_states}'
+workers -- '{self.workers}'
+retries -- '{self.retries}'
+timeout -- '{self.timeout}'
+use_async -- '{self.use_async}'
+per_host -- '{self.per_host}'
+rate_limit -- '{self.rate_limit}'
+stream -- '{self.stream}'
+bulk -- '{self.bulk}'
+validate -- '{self.validate}'
+spike_factor -- '{self.spike_factor}'
+spike_window -- '{self.spike_window}'
+project_metrics -- '{self.project_metrics}'
+project_window -- '{self.project_window}'
+project_days -- '{self.project_days}'
+sum_states -- '{self.sum_states}'
+rollups -- '{self.rollups}'
+rank_metric -- '{self.rank_metric}'
+rank_top -- '{self.rank_top}'
+rank_window -- '{self.rank_window}'
+snapshot_save -- '{self.snapshot_save}'
+snapshot_load -- '{self.snapshot_load}'
+incremental -- '{self.incremental}'
+arrow_export -- '{self.arrow_export}'
+arrow_import -- '{self.arrow_import}'
+date_from -- '{self.date_from}'
+date_to -- '{self.date_to}'
 plot_all -- '{self.plot_all}'
 plot -- '{self.plot}'
 print_all -- '{self.print_all}'
 print -- '{self.print}'
+print_format -- '{self.print_format}'
+print_output -- '{self.print_output}'
 chart_title -- '{self.chart_title}'
 y_axis_title -- '{self.y_axis_title}'
 x_axis_title -- '{self.x_axis_title}'
 legend_location -- '{self.legend_location}'
 style -- '{self.style}'
 width -- '{self.width}'
+bar_mode -- '{self.bar_mode}'
+bin_size -- '{self.bin_size}'
 num_dates -- '{self.num_dates}'
 length -- '{self.length}'
 height -- '{self.height}'
 figsize -- '{"x".join([str(i) for i in self.figsize])}'
+output_dir -- '{self.output_dir}'
+output_format -- '{self.output_format}'
+chart_name -- '{self.chart_name}'
+batch_sets -- '{self.batch_sets}'
+jobs_file -- '{self.jobs_file}'
+watch_interval -- '{self.watch_interval}'
+processes -- '{self.processes}'
+profile_report -- '{self.profile_report}'
+profile_allocations -- '{self.profile_allocations}'
+serve_port -- '{self.serve_port}'
+serve_host -- '{self.serve_host}'
+refresh_interval -- '{self.refresh_interval}'
 """)
 
+    def getMetricHelp(self):
+        """
+        Two-column `short, key` listing of METRICS for help()
+        """
+        lines = []
+        for derived in [False, True]:
+            if derived:
+                lines.append("    Derived Options:")
+            opts = [f"{m['short']}, {m['key']}" for m in METRICS if ("derive" in m) == derived]
+            for i in range(0, len(opts), 2):
+                lines.append("        " + "".join(f"{opt:<26}" for opt in opts[i:i+2]).rstrip())
+        return "\n".join(lines)
+
     def help(self):
         """
         Old Menu Crap
@@ -864,19 +3227,144 @@ Help:
 
 Options:
     -all, --printall              Prints all data
+    --print=<options>             Prints the selected options (same as --plot=)
+    -pf,  --print-format          Declares the printed format: table, csv, tsv
+                                  (Default: table). CSV/TSV on stdout sends every
+                                  other message to stderr
+    -po,  --print-output          Writes printed data to this file (Default: stdout)
     -dt,  --data-type             Declares whether you want state/national data
-    -d,   --date                  Declares the specific date
+    -d,   --date                  Declares the specific date (YYYYMMDD or YYYY-MM-DD)
+    -fr,  --from                  Declares the first date shown (inclusive)
+    -to,  --to                    Declares the last date shown (inclusive)
     -df,  --date-format           Declares the date format (Default: YYYYDDMM)
     -nd,  --num-dates             Declares the number of dates to print on plot
     -l,   --last                  Declares the last # of data points to print
+                                  (applied after --from/--to)
     -p,   --plot                  Sets to plot the data in a bar graph
     -S,   --state                 Declares state (Default: 'UT')
+    -SS,  --states                Declares several states fetched concurrently in
+                                  one process. Either `all` or a list (`ut,ca,ny`)
+    -W,   --workers               Declares the maximum requests in flight (Default: 8)
+    -R,   --retries               Declares retries with backoff per request (Default: 3)
+    -T,   --timeout               Declares the seconds before a request is
+                                  abandoned (Default: 30)
+    -A,   --async                 Fetches through an asyncio (aiohttp) client with
+                                  one connection pool and jittered retries
+          --per-host              Declares connections per host for `--async`
+                                  (Default: same as --workers)
+          --rate                  Declares requests per second per host for
+                                  `--async` (Default: 0, unlimited)
+    -sm,  --stream                Decodes responses record by record as they arrive
+                                  so peak memory does not grow with the history
+    -BK,  --bulk                  Fetches every state's history in one request
+                                  (/states/daily.json) and splits it by state.
+                                  Use with -S, -SS, --rank or --region.
     -xy,  --size                  Declares length & height of the graph window
     Required Format:             `length`x`height` where length & height are
                                   integers. Default is (12x6)
 
+Multi-State:
+    -G,   --sum-states            Sums the loaded states (-SS) into one dataset
+    -RG,  --region                Sums states by census region. Either `all` or a
+                                  list of northeast, midwest, south, west
+    -rk,  --rank                  Prints the top states by a metric (e.g. nck).
+                                  Fetches all states unless -SS is given.
+    -tk,  --top                   Declares how many states `--rank` lists (Default: 10)
+    -rw,  --rank-window           Declares the days averaged by `--rank` (Default: 1)
+
+Data Quality:
+    -V,   --validate              Checks the loaded data for totals that decrease,
+                                  increases that differ from the change in their
+                                  total, null fields and spikes, and prints a
+                                  summary. One of:
+                                      report  only prints the summary
+                                      mask    blanks the flagged values
+                                      repair  fixes nulls/decreases in totals and
+                                              recomputes increases from them
+    -sf,  --spike-factor          Declares the standard deviations above the
+                                  trailing 14-day mean that make a spike (Default: 5)
+
+Projections:
+    -pj,  --project               Fits log-linear growth to these metrics (e.g.
+                                  `nc,nd`) for every loaded state, prints growth
+                                  and doubling time, and draws the projection on
+                                  plots as a dashed line
+    -pw,  --project-window        Declares the days the fit uses (Default: 21)
+    -ph,  --project-days          Declares the days projected (Default: 14)
+
+Profiling:
+    -pr,  --profile-report        Writes wall time and counters (bytes downloaded,
+                                  records parsed, cache hits) for each stage of the
+                                  run, and for the whole run, and the process's peak
+                                  memory so far after each stage, to a JSON file
+    -pa,  --profile-allocations   Adds tracemalloc allocation peaks per stage
+                                  to the report (slower)
+
+Caching:
+    -B,   --base-url              Declares the API base url (e.g. a local mirror)
+    -nc,  --no-cache              Disables the response cache
+    -O,   --offline               Only serves responses from the cache
+    -cd,  --cache-dir             Declares the cache directory
+                                  (Default: ~/.cache/covid_tracker)
+    -ct,  --cache-ttl             Declares seconds before cached responses are
+                                  revalidated with the server (Default: 3600)
+    -cs,  --cache-size            Declares the maximum cache size in MB (Default: 50)
+
+Snapshots:
+    -sv,  --save                  Saves the parsed data (every fetched state) to a
+                                  binary snapshot file
+    -ld,  --load                  Loads data from a snapshot file (memory-mapped)
+                                  instead of the API. Use with -S or -SS.
+    -U,   --update                Updates a snapshot file in place, fetching only
+                                  the `current` record and any missing dates.
+                                  Prints what changed for each state.
+    -ea,  --export-arrow          Writes the parsed data (every fetched state) as
+                                  one typed table: Parquet if the file ends in
+                                  `.parquet`, otherwise Arrow IPC (needs pyarrow)
+    -ia,  --import-arrow          Loads data from a Parquet/Arrow file instead of
+                                  the API. Use with -S or -SS.
+
+Headless Rendering:
+    -o,   --output-dir            Saves charts to this directory instead of showing
+                                  them (non-interactive backend)
+    -f,   --format                Declares the format of saved charts: png, svg
+    -N,   --name                  Declares the saved chart's name, which replaces
+                                  the metric keywords: <state>_<name>.<format>
+    -b,   --batch                 Renders every metric set for every state (-S/-SS)
+                                  in a process pool. Sets are separated by `;`
+                                  e.g. `nc;nc7,nd7;pr` (Default output: ./charts)
+    -P,   --processes             Declares the number of render processes
+    -J,   --jobs                  Runs every job in a .json/.toml/.yaml file in one
+                                  process. Each unique URL is fetched once and the
+                                  jobs share the data. Saved charts and printing run
+                                  in parallel. The file is a list of jobs, or
+                                  `jobs` plus `defaults`. Each job is a list or a
+                                  string of the options above. Jobs that would save
+                                  the same chart get `_job<n>` appended unless they
+                                  set -N, e.g.
+                                      {"defaults": ["-o", "charts", "-l", "30"],
+                                       "jobs": ["-S ut --plot=nc,nc7",
+                                                ["-S", "ca", "--print=nc"]]}
+
+Server:
+    -sp,  --serve                 Keeps the data (-S/-SS/--load) in memory and
+                                  serves it as JSON on this port:
+                                      /states, /metrics, /states/ut,
+                                      /states/ut/new_cases?last=30
+    -H,   --host                  Declares the address to bind (Default: 127.0.0.1)
+    -r,   --refresh               Declares seconds between background refreshes
+                                  (Default: 3600)
+
 Advanced Plotting:
     -st,  --stack                 Toggles whether to stack bar graphs
+    -gr,  --group                 Toggles whether to draw bars side by side
+    -bn,  --bin                   Declares how long charts are downsampled: auto,
+                                  none, week, month, peaks or a number of days.
+                                  `auto` keeps daily bars while they fit the
+                                  chart's pixel width (Default: auto)
+    -wt,  --watch                 Keeps the chart of the first state open (or its
+                                  -o file) and polls for new data every N
+                                  seconds, updating the bars in place
     -L,   --legend                Declares the Graph's legend location
     -mt,  --main-title            Declares Main Graph Title (Put in quotes)
     -yt,  --y-title               Declares Y Axis Title
@@ -887,14 +3375,7 @@ Advanced Plotting:
     --plot=<options>              Toggles custom plotting.
     --cplot=<option:color>      Toggles custom plotting and colors.
     Options Include:
-        ac, active_cases          ng, negative
-        ch, hospitalized          th, total_hospitalized
-        ci, in_icu                ti, total_in_icu
-        cv, on_ventilator         tv, total_on_ventilator
-        tr, total_recovered       td, total_deaths
-        tt, total_tested          pn, pos_neg
-        nd, new_deaths            nh, new_hospitalized
-        nc, new_cases
+""" + self.getMetricHelp() + """
 
 
 Examples:
@@ -904,6 +3385,56 @@ Examples:
 
 """)
 
+BATCH_TRACKER = None
+
+def initBatchWorker(cli_args):
+    global BATCH_TRACKER
+    BATCH_TRACKER = CovidTracker(cli_args=cli_args)
+
+def renderBatchChart(state, columns, opts):
+    tracker = BATCH_TRACKER
+    tracker.datasets[state] = columns
+    tracker.useDataset(state)
+    tracker.resetSelection()
+    for opt in opts:
+        tracker.processFlag(opt.strip(), "plot")
+    if tracker.project_metrics is not None:
+        tracker.projectStates([state], report=False)
+    tracker.applyModifier()
+    if tracker.isEmptyRange():
+        return None
+    return tracker.plotData()
+
+JOB_DATASETS = None
+JOB_FIGURE = None # Reused by every chart a job worker saves
+
+def initJobWorker(datasets):
+    # Every worker receives the shared datasets ({url: columns}) once
+    global JOB_DATASETS
+    JOB_DATASETS = datasets
+
+def runJob(cli_args, urls):
+    """
+    Runs one job against the shared datasets. Returns (what it printed,
+    the message it exited with or None).
+    """
+    global JOB_FIGURE
+    import io
+    import contextlib
+    out = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(out):
+        try:
+            tracker = CovidTracker(cli_args=cli_args)
+            tracker.figure = JOB_FIGURE
+            tracker.resolveStates()
+            tracker.datasets.update({key: JOB_DATASETS[url] for key, url in urls.items() if url in JOB_DATASETS})
+            tracker.process(list(urls))
+            JOB_FIGURE = tracker.figure
+        except SystemExit as e:
+            error = str(e)
+    return out.getvalue(), error
+
 if __name__ == '__main__':
     Tracker = CovidTracker(cli_args=sys.argv)
     Tracker.run()